@@ -0,0 +1,93 @@
+import asyncio
+import functools
+from collections.abc import Sequence
+from typing import Any, Self, TypeVar
+
+from eth_typing import ChecksumAddress
+from web3.contract import AsyncContract
+from web3.contract.async_contract import AsyncContractFunction
+
+from clients.flare.base import MAX_BATCH_SIZE, ReadCall
+from clients.flare.flare import BlockAnchors
+from configuration import rpc
+from configuration.settings import settings
+
+T = TypeVar("T")
+
+
+class Client:
+    # NOTE: asyncio counterpart of the read side of `flare.Client`, contract calls
+    # are still prepared by the sync contract clients (`*_call` builders) and only
+    # rebound to an async contract here, so every contract keeps one definition
+    def __init__(self, rpc_url: str) -> None:
+        self._client = rpc.new_async_web3_client(rpc_url)
+        self._contracts: dict[ChecksumAddress, AsyncContract] = {}
+
+    @classmethod
+    def default(cls) -> Self:
+        return cls(settings.flr_rpc_url)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self._client.provider.disconnect()
+
+    def _async_function(self, read_call: ReadCall[Any]) -> AsyncContractFunction:
+        fn = read_call.function
+        if fn.address not in self._contracts:
+            self._contracts[fn.address] = self._client.eth.contract(
+                address=fn.address, abi=fn.contract_abi
+            )
+
+        contract = self._contracts[fn.address]
+        return contract.functions[fn.abi_element_identifier](*fn.args, **fn.kwargs)
+
+    async def read(self, read_call: ReadCall[T]) -> T:
+        return read_call.mapper(await self._async_function(read_call).call())
+
+    async def batch_read(self, calls: Sequence[ReadCall[Any]]) -> list[Any]:
+        async def read_chunk(chunk: Sequence[ReadCall[Any]]) -> list[Any]:
+            async with self._client.batch_requests() as batch:
+                for read_call in chunk:
+                    batch.add(self._async_function(read_call))
+                responses = await batch.async_execute()
+
+            return [
+                read_call.mapper(response)
+                for read_call, response in zip(chunk, responses, strict=True)
+            ]
+
+        # chunks are independent requests, so they are sent together
+        chunks = await asyncio.gather(
+            *(
+                read_chunk(calls[i : i + MAX_BATCH_SIZE])
+                for i in range(0, len(calls), MAX_BATCH_SIZE)
+            )
+        )
+        return [result for chunk in chunks for result in chunk]
+
+    async def get_block_number(self) -> int:
+        return await self._client.eth.block_number
+
+    @functools.cached_property
+    def _block_anchors(self) -> BlockAnchors:
+        return BlockAnchors.default()
+
+    async def _get_block_anchor(self, block: int | str) -> tuple[int, int]:
+        b = await self._client.eth.get_block(block)  # type: ignore
+        assert "timestamp" in b and "number" in b
+        return self._block_anchors.add((b["timestamp"], b["number"]))
+
+    async def find_block_near_timestamp(
+        self, timestamp: int, tolerance: int = 10
+    ) -> int:
+        search = self._block_anchors.search(timestamp, tolerance)
+        try:
+            block = next(search)
+            while True:
+                block = search.send(await self._get_block_anchor(block))
+        except StopIteration as e:
+            return e.value
+        finally:
+            self._block_anchors.save()
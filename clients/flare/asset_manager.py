@@ -84,39 +84,11 @@ class Client(base.BaseContractClient):
         from_block: int,
         to_block: int | None = None,
     ) -> list[CollateralReserved]:
-        _to_block = self._client._client.eth.block_number
-        to_block = min(to_block or _to_block, _to_block)
-
-        events = []
-
-        for b in range(from_block, to_block, 30):
-            events.extend(
-                self._contract.events.CollateralReserved().get_logs(
-                    from_block=b,
-                    to_block=min(b + 29, to_block),
-                    argument_filters={"minter": minter},
-                )
-            )
-
-        ret = []
-
-        for event in events:
-            a = event["args"]
-            ret.append(
-                CollateralReserved(
-                    agent_vault=a["agentVault"],
-                    minter=a["minter"],
-                    collateral_reservation_id=a["collateralReservationId"],
-                    value_uba=a["valueUBA"],
-                    fee_uba=a["feeUBA"],
-                    first_underlying_block=a["firstUnderlyingBlock"],
-                    last_underlying_block=a["lastUnderlyingBlock"],
-                    last_underlying_timestamp=a["lastUnderlyingTimestamp"],
-                    payment_address=a["paymentAddress"],
-                    payment_reference=a["paymentReference"],
-                    executor=a["executor"],
-                    executor_fee_nat_wei=a["executorFeeNatWei"],
-                )
-            )
+        events = self._client.log_scanner.scan(
+            self._contract.events.CollateralReserved(),
+            from_block,
+            to_block,
+            argument_filters={"minter": minter},
+        )
 
-        return ret
+        return [CollateralReserved.from_event_data(e) for e in events]
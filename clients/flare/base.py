@@ -1,25 +1,74 @@
-import web3
+import functools
+from collections.abc import Callable, Sequence
+from typing import Any, Generic, TypeVar
+
+import attrs
 from eth_typing import ABI, ChecksumAddress
 from hexbytes import HexBytes
-from web3 import middleware
 from web3._utils.events import EventLogErrorFlags
-from web3.contract.contract import Contract, ContractEvent
+from web3.contract.contract import Contract, ContractEvent, ContractFunction
 from web3.types import EventData, TxParams, TxReceipt
 
+from clients.flare.log_scanner import LogScanner
+from configuration import rpc
+
+T = TypeVar("T")
+
+# upper bound of calls sent in one json-rpc batch, public rpcs reject bigger ones
+MAX_BATCH_SIZE = 100
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@attrs.frozen
+class ReadCall(Generic[T]):
+    # a prepared eth_call and the mapper from its decoded output to the typed result
+    function: ContractFunction
+    mapper: Callable[[Any], T] = _identity
+
+    def call(self) -> T:
+        return self.mapper(self.function.call())
+
 
 class BaseClient:
-    def __init__(self, rpc_url: str):
-        self._client = web3.Web3(web3.Web3.HTTPProvider(rpc_url))
-        self._client.middleware_onion.inject(
-            middleware.ExtraDataToPOAMiddleware,
-            layer=0,
-        )
-        self._client.middleware_onion.remove("gas_price_strategy")
-        self._client.middleware_onion.remove("gas_estimate")
+    def __init__(self, rpc_url: str, shared: bool = True):
+        # all clients talk through one pooled provider per rpc url, read only
+        # clients also share the web3 instance while clients that inject their own
+        # middleware (e.g. signing) need a private one
+        if shared:
+            self._client = rpc.web3_client(rpc_url)
+        else:
+            self._client = rpc.new_web3_client(rpc_url)
 
     def get_contract(self, address: ChecksumAddress, abi: ABI) -> Contract:
         return self._client.eth.contract(address=address, abi=abi)
 
+    @functools.cached_property
+    def log_scanner(self) -> LogScanner:
+        return LogScanner(self._client)
+
+    def batch_read(self, calls: Sequence[ReadCall[Any]]) -> list[Any]:
+        # NOTE: calls must come from contract clients built on this client's web3
+        # instance (every `default()` client is), otherwise they are not batched
+        results = []
+
+        for i in range(0, len(calls), MAX_BATCH_SIZE):
+            chunk = calls[i : i + MAX_BATCH_SIZE]
+
+            with self._client.batch_requests() as batch:
+                for read_call in chunk:
+                    batch.add(read_call.function)
+                responses = batch.execute()
+
+            results.extend(
+                read_call.mapper(response)
+                for read_call, response in zip(chunk, responses, strict=True)
+            )
+
+        return results
+
 
 class BaseContractClient:
     def __init__(self, client: BaseClient, address: ChecksumAddress, abi: ABI) -> None:
@@ -36,6 +85,9 @@ class BaseContractClient:
     def abi(self) -> ABI:
         return self._abi
 
+    def batch_read(self, calls: Sequence[ReadCall[Any]]) -> list[Any]:
+        return self._client.batch_read(calls)
+
     def _encode_tx(self, fn_name: str, args: list) -> TxParams:
         data = self._contract.encode_abi(
             abi_element_identifier=fn_name,
@@ -0,0 +1,376 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Self, TypeVar
+
+import attrs
+from web3.types import EventData
+
+import configuration.utils
+from clients.flare import asset_manager, base, firelight, master_account_controller
+from configuration.settings import settings
+
+T = TypeVar("T")
+
+# blocks scanned between commits when syncing long ranges
+SYNC_CHUNK = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scanned (
+    stream TEXT NOT NULL,
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scanned_stream ON scanned (stream, from_block);
+
+CREATE TABLE IF NOT EXISTS collateral_reserved (
+    address TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    minter TEXT NOT NULL,
+    collateral_reservation_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS collateral_reserved_minter
+    ON collateral_reserved (minter, block_number);
+CREATE INDEX IF NOT EXISTS collateral_reserved_id
+    ON collateral_reserved (collateral_reservation_id);
+
+CREATE TABLE IF NOT EXISTS redeem_requested (
+    address TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    personal_account TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS redeem_requested_personal_account
+    ON redeem_requested (personal_account, block_number);
+
+CREATE TABLE IF NOT EXISTS withdraw_request (
+    address TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS withdraw_request_owner
+    ON withdraw_request (owner, block_number);
+"""
+
+
+def _dump(event: Any) -> str:
+    return json.dumps(
+        attrs.asdict(
+            event,
+            value_serializer=lambda _, __, v: v.hex() if isinstance(v, bytes) else v,
+        )
+    )
+
+
+def _load(cls: type[T], data: str) -> T:
+    values = json.loads(data)
+    for a in attrs.fields(cls):  # type: ignore
+        if a.type is bytes:
+            values[a.name] = bytes.fromhex(values[a.name])
+    return cls(**values)
+
+
+class EventIndex:
+    # NOTE: decoded events are stored in sqlite together with the block ranges that
+    # were scanned for them, queries only ask the chain for blocks never seen before
+    def __init__(self, path: Path) -> None:
+        # async handlers and the server use the index from several threads, the
+        # connection is shared and every read or write holds the lock (scans don't)
+        self._db = self._connect(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.executescript(SCHEMA)
+            # fails now instead of on the first write when the file is read only
+            db.execute("BEGIN IMMEDIATE")
+            db.rollback()
+            return db
+        except (OSError, sqlite3.Error):
+            # index is best effort like the other caches, a read only cache dir
+            # only means nothing is kept between runs
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.executescript(SCHEMA)
+            return db
+
+    @classmethod
+    def default(cls) -> Self:
+        return cls(settings.cache_dir / f"events-{settings.chain_id}.sqlite")
+
+    # scanned ranges
+
+    def _scanned(self, stream: str) -> list[tuple[int, int]]:
+        return self._db.execute(
+            "SELECT from_block, to_block FROM scanned WHERE stream = ? "
+            "ORDER BY from_block",
+            (stream,),
+        ).fetchall()
+
+    def _missing(
+        self, stream: str, from_block: int, to_block: int
+    ) -> list[tuple[int, int]]:
+        missing = []
+        cursor = from_block
+
+        for start, end in self._scanned(stream):
+            if end < cursor:
+                continue
+            if start > to_block:
+                break
+            if start > cursor:
+                missing.append((cursor, start - 1))
+            cursor = end + 1
+
+        if cursor <= to_block:
+            missing.append((cursor, to_block))
+
+        return missing
+
+    def _mark_scanned(self, stream: str, from_block: int, to_block: int) -> None:
+        merged: list[list[int]] = []
+        for start, end in sorted([*self._scanned(stream), (from_block, to_block)]):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self._db.execute("DELETE FROM scanned WHERE stream = ?", (stream,))
+        self._db.executemany(
+            "INSERT INTO scanned (stream, from_block, to_block) VALUES (?, ?, ?)",
+            [(stream, start, end) for start, end in merged],
+        )
+
+    def sync(
+        self,
+        client: base.BaseContractClient,
+        event_name: str,
+        from_block: int,
+        to_block: int | None = None,
+    ) -> int:
+        store = {
+            "CollateralReserved": self._store_collateral_reserved,
+            "RedeemRequested": self._store_redeem_requested,
+            "WithdrawRequest": self._store_withdraw_request,
+        }[event_name]
+
+        scanner = client._client.log_scanner
+        to_block = scanner.clamp_to_head(to_block)
+        stream = f"{event_name}:{client.address}"
+
+        with self._lock:
+            missing = self._missing(stream, from_block, to_block)
+
+        # NOTE: the chain is scanned without the lock, so a slow scan does not hold
+        # up other requests, concurrent syncs of one range both scan it and store
+        # the same rows, which are ignored as duplicates
+        for start, end in missing:
+            # commit in chunks so an interrupted long sync keeps its progress
+            for chunk_start in range(start, end + 1, SYNC_CHUNK):
+                chunk_end = min(chunk_start + SYNC_CHUNK - 1, end)
+                event = getattr(client._contract.events, event_name)()
+                events = scanner.scan(event, chunk_start, chunk_end)
+
+                with self._lock:
+                    for event_data in events:
+                        store(client.address, event_data)
+                    self._mark_scanned(stream, chunk_start, chunk_end)
+                    self._db.commit()
+
+        return to_block
+
+    def _store_collateral_reserved(self, address: str, event_data: EventData) -> None:
+        event = asset_manager.CollateralReserved.from_event_data(event_data)
+        self._db.execute(
+            "INSERT OR IGNORE INTO collateral_reserved VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                address,
+                event_data["transactionHash"].hex(),
+                event_data["logIndex"],
+                event_data["blockNumber"],
+                event.minter,
+                str(event.collateral_reservation_id),
+                _dump(event),
+            ),
+        )
+
+    def _store_redeem_requested(self, address: str, event_data: EventData) -> None:
+        event = master_account_controller.RedeemRequested.from_event_data(event_data)
+        self._db.execute(
+            "INSERT OR IGNORE INTO redeem_requested VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                address,
+                event_data["transactionHash"].hex(),
+                event_data["logIndex"],
+                event_data["blockNumber"],
+                event.personal_account,
+                _dump(event),
+            ),
+        )
+
+    def _store_withdraw_request(self, address: str, event_data: EventData) -> None:
+        event = firelight.WithdrawRequest.from_event_data(event_data)
+        self._db.execute(
+            "INSERT OR IGNORE INTO withdraw_request VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                address,
+                event_data["transactionHash"].hex(),
+                event_data["logIndex"],
+                event_data["blockNumber"],
+                event.owner,
+                _dump(event),
+            ),
+        )
+
+    @staticmethod
+    def _where(filters: dict[str, Any]) -> tuple[str, list[Any]]:
+        filters = {k: v for k, v in filters.items() if v is not None}
+        clause = "".join(f" AND {k} = ?" for k in filters)
+        return clause, list(filters.values())
+
+    def _query(self, sql: str, params: list[Any]) -> list[Any]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # CollateralReserved
+
+    def collateral_reserved(
+        self,
+        client: asset_manager.Client,
+        from_block: int,
+        to_block: int | None = None,
+        *,
+        minter: str | None = None,
+        collateral_reservation_id: int | None = None,
+        tx_hash: str | None = None,
+    ) -> list[asset_manager.CollateralReserved]:
+        to_block = self.sync(client, "CollateralReserved", from_block, to_block)
+
+        clause, params = self._where(
+            {
+                "minter": minter,
+                "collateral_reservation_id": (
+                    None
+                    if collateral_reservation_id is None
+                    else str(collateral_reservation_id)
+                ),
+                "tx_hash": tx_hash and tx_hash.removeprefix("0x").lower(),
+            }
+        )
+        rows = self._query(
+            "SELECT data FROM collateral_reserved "
+            "WHERE address = ? AND block_number BETWEEN ? AND ?"
+            f"{clause} ORDER BY block_number, log_index",
+            [client.address, from_block, to_block, *params],
+        )
+
+        return [_load(asset_manager.CollateralReserved, r[0]) for r in rows]
+
+    # RedeemRequested
+
+    def redeem_requested(
+        self,
+        client: master_account_controller.Client,
+        from_block: int,
+        to_block: int | None = None,
+        *,
+        personal_account: str | None = None,
+        tx_hash: str | None = None,
+    ) -> list[master_account_controller.RedeemRequested]:
+        to_block = self.sync(client, "RedeemRequested", from_block, to_block)
+
+        clause, params = self._where(
+            {
+                "personal_account": personal_account,
+                "tx_hash": tx_hash and tx_hash.removeprefix("0x").lower(),
+            }
+        )
+        rows = self._query(
+            "SELECT data FROM redeem_requested "
+            "WHERE address = ? AND block_number BETWEEN ? AND ?"
+            f"{clause} ORDER BY block_number, log_index",
+            [client.address, from_block, to_block, *params],
+        )
+
+        return [_load(master_account_controller.RedeemRequested, r[0]) for r in rows]
+
+    # WithdrawRequest
+
+    def withdraw_request(
+        self,
+        client: firelight.Client,
+        from_block: int,
+        to_block: int | None = None,
+        *,
+        owner: str | None = None,
+        tx_hash: str | None = None,
+    ) -> list[firelight.WithdrawRequest]:
+        to_block = self.sync(client, "WithdrawRequest", from_block, to_block)
+
+        clause, params = self._where(
+            {
+                "owner": owner,
+                "tx_hash": tx_hash and tx_hash.removeprefix("0x").lower(),
+            }
+        )
+        rows = self._query(
+            "SELECT data FROM withdraw_request "
+            "WHERE address = ? AND block_number BETWEEN ? AND ?"
+            f"{clause} ORDER BY block_number, log_index",
+            [client.address, from_block, to_block, *params],
+        )
+
+        return [_load(firelight.WithdrawRequest, r[0]) for r in rows]
+
+
+class CollateralReservedWatcher:
+    # follows a block range as the chain grows, every poll only looks at blocks
+    # after the last scanned one and returns reservations not returned before
+    def __init__(
+        self,
+        index: EventIndex,
+        client: asset_manager.Client,
+        from_block: int,
+        to_block: int,
+        minter: str | None = None,
+    ) -> None:
+        self._index = index
+        self._client = client
+        self._to_block = to_block
+        self._minter = minter
+
+        self.cursor = from_block
+        self.seen: set[int] = set()
+
+    def poll(self) -> list[asset_manager.CollateralReserved]:
+        if self.cursor > self._to_block:
+            return []
+
+        head = self._index.sync(
+            self._client, "CollateralReserved", self.cursor, self._to_block
+        )
+        events = self._index.collateral_reserved(
+            self._client, self.cursor, head, minter=self._minter
+        )
+        self.cursor = head + 1
+
+        new = [e for e in events if e.collateral_reservation_id not in self.seen]
+        self.seen.update(e.collateral_reservation_id for e in new)
+        return new
+
+
+event_index = configuration.utils.wrap_singleton(EventIndex.default)
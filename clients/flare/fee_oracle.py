@@ -0,0 +1,89 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+import web3
+from web3.types import TxParams, Wei
+
+# seconds fee data is reused for, about one flare block
+FEE_DATA_MAX_AGE = 1.8
+# gas limit sent is the (memoized) estimate times this
+GAS_MARGIN = 1.5
+# upper bound of memoized gas estimates, least recently used are dropped first
+MAX_GAS_ESTIMATES = 1024
+
+
+class FeeOracle:
+    # NOTE: everything a transaction needs besides its nonce, cached so that bursts
+    # of transactions are built without any request, fee data is refreshed about
+    # once per block and gas estimates are memoized per call shape
+    def __init__(self, client: web3.Web3) -> None:
+        self._client = client
+        self._lock = threading.Lock()
+
+        self._fee_data: tuple[float, int, Wei] | None = None
+        self._gas: OrderedDict[tuple[str, str, str, int, int], int] = OrderedDict()
+
+    @functools.cached_property
+    def chain_id(self) -> int:
+        return self._client.eth.chain_id
+
+    def fee_data(self) -> tuple[int, Wei]:
+        with self._lock:
+            now = time.monotonic()
+            if self._fee_data is None or now - self._fee_data[0] > FEE_DATA_MAX_AGE:
+                block = self._client.eth.get_block("latest")
+                base_fee = block["baseFeePerGas"]  # type: ignore
+                self._fee_data = (now, base_fee, self._client.eth.max_priority_fee)
+
+            return self._fee_data[1], self._fee_data[2]
+
+    def estimate_gas(self, tx_params: TxParams) -> int:
+        # calls to the same function with same sized calldata cost about the same,
+        # the margin covers what differs between them
+        data = tx_params.get("data") or "0x"
+        if isinstance(data, bytes):
+            data = data.hex()
+        data = data.removeprefix("0x")
+
+        key = (
+            str(tx_params.get("from")),
+            str(tx_params.get("to")),
+            data[:8],
+            len(data),
+            int(tx_params.get("value") or 0),
+        )
+        with self._lock:
+            if key in self._gas:
+                self._gas.move_to_end(key)
+                return self._gas[key]
+
+        # estimated without the lock, concurrent misses of one key only estimate
+        # it more than once
+        gas = int(self._client.eth.estimate_gas(tx_params) * GAS_MARGIN)
+
+        with self._lock:
+            self._gas[key] = gas
+            if len(self._gas) > MAX_GAS_ESTIMATES:
+                self._gas.popitem(last=False)
+        return gas
+
+    def build(self, tx_params: TxParams) -> TxParams:
+        base_fee, max_priority_fee = self.fee_data()
+
+        return {
+            **tx_params,
+            # we don't expect these to be set before sending and we override them
+            "chainId": self.chain_id,
+            "type": 2,
+            "gas": self.estimate_gas(tx_params),
+            "maxFeePerGas": Wei(base_fee * 2 + max_priority_fee),
+            "maxPriorityFeePerGas": max_priority_fee,
+        }
+
+
+@functools.cache
+def fee_oracle(client: web3.Web3) -> FeeOracle:
+    # one oracle per web3 instance, which is shared per rpc url
+    return FeeOracle(client)
@@ -1,13 +1,114 @@
+import bisect
+import functools
+import time
+from collections.abc import Generator, Sequence
 from typing import Self
 
+import attrs
+import requests
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 from eth_typing import ChecksumAddress
-from web3 import middleware
-from web3.types import Nonce, TxParams, Wei
+from hexbytes import HexBytes
+from web3.exceptions import (
+    ContractLogicError,
+    TimeExhausted,
+    TransactionNotFound,
+    Web3Exception,
+)
+from web3.types import Nonce, TxParams, TxReceipt, Wei
 
 from clients.flare import base
+from clients.flare.fee_oracle import FeeOracle, fee_oracle
+from clients.flare.nonce import NonceManager, is_known_tx_error, is_nonce_error
+from configuration.cache import JsonFileCache
 from configuration.settings import settings
+from configuration.trace import trace
+
+# upper bound of timestamp anchors kept on disk, oldest are dropped first
+MAX_BLOCK_ANCHORS = 4096
+
+# seconds between receipt polls and without any mined transaction before pending
+# ones are broadcast again
+RECEIPT_POLL_INTERVAL = 1
+REBROADCAST_AFTER = 30
+
+
+class BlockAnchors:
+    # sorted (timestamp, block number) pairs seen by previous searches, persisted
+    # per chain so repeated lookups converge in one or two requests
+    def __init__(self, cache: JsonFileCache, key: str) -> None:
+        self._cache = cache
+        self._key = key
+        self.anchors: list[tuple[int, int]] = sorted(map(tuple, cache.get(key) or []))
+
+    @classmethod
+    def default(cls) -> Self:
+        return cls(
+            JsonFileCache(settings.cache_dir / "blocks.json"), str(settings.chain_id)
+        )
+
+    def save(self) -> None:
+        self._cache.set(self._key, self.anchors[-MAX_BLOCK_ANCHORS:])
+
+    def add(self, anchor: tuple[int, int]) -> tuple[int, int]:
+        i = bisect.bisect_left(self.anchors, anchor)
+        if i == len(self.anchors) or self.anchors[i] != anchor:
+            self.anchors.insert(i, anchor)
+        return anchor
+
+    def search(
+        self, timestamp: int, tolerance: int
+    ) -> Generator[int | str, tuple[int, int], int]:
+        # NOTE: searches start from the closest known anchors and step by
+        # interpolation (secant) instead of bisection, the generator yields block
+        # ids to fetch and is sent back their anchors, so sync and async clients
+        # drive the same search with their own transport
+        i = bisect.bisect_left(self.anchors, (timestamp, 0))
+
+        a = self.anchors[i - 1] if i > 0 else None
+        b = self.anchors[i] if i < len(self.anchors) else None
+
+        for anchor in (a, b):
+            if anchor is not None and abs(anchor[0] - timestamp) < tolerance:
+                return anchor[1]
+
+        if b is None:
+            b = yield "latest"
+        assert timestamp < b[0]
+
+        # no anchor before timestamp, walk back until one is found
+        step = 1_000_000
+        while a is None or a[0] > timestamp:
+            a = yield max(b[1] - step, 0)
+            if a[1] == 0:
+                break
+            step *= 2
+        assert timestamp > a[0]
+
+        bisect_next = False
+        while b[1] - a[1] > 1:
+            if bisect_next:
+                c_block = (a[1] + b[1]) // 2
+            else:
+                c_block = a[1] + (timestamp - a[0]) * (b[1] - a[1]) // (b[0] - a[0])
+                c_block = min(max(c_block, a[1] + 1), b[1] - 1)
+
+            c = yield c_block
+
+            if abs(c[0] - timestamp) < tolerance:
+                return c[1]
+
+            span = b[1] - a[1]
+            if c[0] > timestamp:
+                (a, b) = (a, c)
+            else:
+                (a, b) = (c, b)
+
+            # fall back to a bisection step when interpolation barely helped
+            bisect_next = not bisect_next and (b[1] - a[1]) * 2 > span
+
+        return a[1]
 
 
 class Client(base.BaseClient):
@@ -18,47 +119,55 @@ class Client(base.BaseClient):
     def get_balance(self, evm_address: ChecksumAddress) -> int:
         return self._client.eth.get_balance(evm_address)
 
-    def find_block_near_timestamp(self, timestamp: int, tolerance: int = 10) -> int:
-        b = self._client.eth.get_block("latest")
-        assert "timestamp" in b and "number" in b
-        assert timestamp < b["timestamp"]
+    @functools.cached_property
+    def _block_anchors(self) -> BlockAnchors:
+        return BlockAnchors.default()
 
-        p_sample = self._client.eth.get_block(b["number"] - 1_000_000)
-        assert "timestamp" in p_sample and "number" in p_sample
+    def _get_block_anchor(self, block: int | str) -> tuple[int, int]:
+        b = self._client.eth.get_block(block)
+        assert "timestamp" in b and "number" in b
+        return self._block_anchors.add((b["timestamp"], b["number"]))
 
-        production_per_s = (b["number"] - p_sample["number"]) / (
-            b["timestamp"] - p_sample["timestamp"]
-        )
+    def find_block_near_timestamp(self, timestamp: int, tolerance: int = 10) -> int:
+        search = self._block_anchors.search(timestamp, tolerance)
+        try:
+            block = next(search)
+            while True:
+                block = search.send(self._get_block_anchor(block))
+        except StopIteration as e:
+            return e.value
+        finally:
+            self._block_anchors.save()
 
-        a = self._client.eth.get_block(
-            b["number"] - int((b["timestamp"] - timestamp) * production_per_s) * 2
-        )
-        assert "timestamp" in a and "number" in a
-        assert timestamp > a["timestamp"]
 
-        while True:
-            c_block = (b["number"] + a["number"]) // 2
-            c = self._client.eth.get_block(c_block)
-            assert "timestamp" in c and "number" in c
+@attrs.frozen
+class SentTransaction:
+    hash: bytes
+    nonce: int
+    # signed transaction, kept to broadcast it again if nodes drop it
+    raw: bytes
 
-            if abs(c["timestamp"] - timestamp) < tolerance:
-                return c["number"]
 
-            if c["timestamp"] > timestamp:
-                (a, b) = (a, c)
-            else:
-                (a, b) = (c, b)
+@attrs.frozen
+class SendResult:
+    # none when the transaction was not sent
+    hash: bytes | None
+    # why it was not sent, e.g. a revert during gas estimation or "not sent"
+    error: str | None = None
 
 
 class SigningClient(Client):
     def __init__(self, rpc_url: str, pk: str) -> None:
+        # transactions are signed locally, so the shared instance is enough
         super().__init__(rpc_url)
 
         self._account: LocalAccount = Account.from_key(pk)
-        self._nonce = self._client.eth.get_transaction_count(self._account.address)
-
-        signer_mw = middleware.SignAndSendRawMiddlewareBuilder.build(self._account)
-        self._client.middleware_onion.inject(signer_mw, layer=0)  # type: ignore
+        self._nonces = NonceManager(
+            lambda: self._client.eth.get_transaction_count(
+                self._account.address, "pending"
+            )
+        )
+        self._sent: dict[bytes, SentTransaction] = {}
 
     @classmethod
     def default_with_pk(cls, pk: str) -> Self:
@@ -68,6 +177,10 @@ class SigningClient(Client):
     def default(cls) -> Self:
         raise NotImplementedError("Use `default_with_pk` method instead.")
 
+    @property
+    def _fees(self) -> FeeOracle:
+        return fee_oracle(self._client)
+
     def _build_tx(
         self,
         tx_params: TxParams,
@@ -75,30 +188,136 @@ class SigningClient(Client):
         tx_params.setdefault("from", self._account.address)
         tx_params.setdefault("value", Wei(0))
 
-        block = self._client.eth.get_block("latest")
-        base_fee = block["baseFeePerGas"]  # type: ignore
-        max_priority_fee = self._client.eth.max_priority_fee
-        max_fee_per_gas = base_fee * 2 + max_priority_fee
+        return self._fees.build(tx_params)
 
-        gas_limit = int(self._client.eth.estimate_gas(tx_params) * 1.5)
-        tx: TxParams = {
-            **tx_params,
-            # we don't expect these to be set before sending and we override them
-            "nonce": Nonce(self._nonce),
-            "chainId": self._client.eth.chain_id,
-            "type": 2,
-            "gas": gas_limit,
-            "maxFeePerGas": Wei(max_fee_per_gas),
-            "maxPriorityFeePerGas": max_priority_fee,
-        }
+    def _send_built_tx(self, tx: TxParams, retry: bool = True) -> SentTransaction:
+        nonce = self._nonces.allocate()
+        signed = self._account.sign_transaction(
+            {**tx, "nonce": Nonce(nonce)}  # type: ignore
+        )
 
-        return tx
+        try:
+            self._client.eth.send_raw_transaction(signed.raw_transaction)
+        except (Web3Exception, ValueError) as e:
+            if retry and is_nonce_error(e):
+                # someone else used the nonce (another process, a replacement)
+                self._nonces.resync()
+                trace.event("nonce_retry")
+                return self._send_built_tx(tx, retry=False)
+            if not is_known_tx_error(e):
+                self._nonces.release(nonce)
+                raise
+            # this exact signed transaction already reached the node (e.g. through
+            # a retried request), so it counts as sent
+            trace.event("send_known_accepted")
+        except requests.Timeout:
+            # the node may have accepted it before the response timed out, only
+            # a nonce it does not count as pending is free again
+            if nonce >= self._nonces.resync():
+                self._nonces.release(nonce)
+                raise
+            trace.event("send_timeout_accepted")
+        except Exception:
+            # never reached the node (connection errors), the nonce would
+            # otherwise leave a gap that blocks every later transaction
+            self._nonces.release(nonce)
+            raise
 
-    def send_transaction(self, tx: TxParams) -> bytes:
-        tx = self._build_tx(tx)
-        tx_hash = self._client.eth.send_transaction(tx)
+        sent = SentTransaction(
+            hash=bytes(signed.hash), nonce=nonce, raw=bytes(signed.raw_transaction)
+        )
+        self._sent[sent.hash] = sent
+        return sent
 
-        self._client.eth.wait_for_transaction_receipt(tx_hash)
-        self._nonce += 1
+    def send_transaction(self, tx: TxParams, wait: bool = True) -> bytes:
+        tx_hash = self._send_built_tx(self._build_tx(tx)).hash
+
+        if wait:
+            self.wait_for_receipts([tx_hash])
 
         return tx_hash
+
+    def send_transactions(
+        self, txs: Sequence[TxParams], wait: bool = True
+    ) -> list[SendResult]:
+        # NOTE: nonces are allocated locally, so every transaction is sent without
+        # waiting for the previous one to be mined and receipts are awaited together
+        results: list[SendResult] = []
+        for tx in txs:
+            try:
+                results.append(SendResult(hash=self.send_transaction(tx, wait=False)))
+            except Exception as e:
+                results.append(
+                    SendResult(hash=None, error=str(e.args[0]) if e.args else repr(e))
+                )
+                # a revert during gas estimation only concerns its own transaction,
+                # anything else (e.g. an unreachable node) would fail the rest too
+                if not isinstance(e, ContractLogicError):
+                    break
+
+        # transactions after a failed send were never built or sent
+        results += [
+            SendResult(hash=None, error="not sent") for _ in txs[len(results) :]
+        ]
+
+        if wait:
+            self.wait_for_receipts([r.hash for r in results if r.hash is not None])
+
+        return results
+
+    def _rebroadcast(self, txs: Sequence[SentTransaction]) -> None:
+        for sent in sorted(txs, key=lambda s: s.nonce):
+            trace.event("rebroadcast")
+            try:
+                self._client.eth.send_raw_transaction(sent.raw)
+            except (Web3Exception, ValueError) as e:
+                # still known to the node or already mined
+                if not (is_known_tx_error(e) or is_nonce_error(e)):
+                    raise
+
+    def wait_for_receipts(
+        self, tx_hashes: Sequence[bytes], timeout: float = 120
+    ) -> list[TxReceipt]:
+        # the mined nonce of the account tells which transactions can have a receipt,
+        # so each poll is one request no matter how many transactions are in flight
+        pending = {h: self._sent[h] for h in tx_hashes}
+        receipts: dict[bytes, TxReceipt] = {}
+
+        deadline = time.monotonic() + timeout
+        last_progress = time.monotonic()
+
+        while True:
+            mined = self._client.eth.get_transaction_count(self._account.address)
+
+            for tx_hash, sent in list(pending.items()):
+                if sent.nonce >= mined:
+                    continue
+
+                try:
+                    receipts[tx_hash] = self._client.eth.get_transaction_receipt(
+                        HexBytes(tx_hash)
+                    )
+                except TransactionNotFound as e:
+                    raise ValueError(
+                        f"transaction 0x{tx_hash.hex()} was replaced by another "
+                        f"transaction with nonce {sent.nonce}"
+                    ) from e
+
+                del pending[tx_hash]
+                self._sent.pop(tx_hash, None)
+                last_progress = time.monotonic()
+
+            if not pending:
+                return [receipts[h] for h in tx_hashes]
+
+            if time.monotonic() > deadline:
+                raise TimeExhausted(
+                    f"{len(pending)} transactions not mined after {timeout} seconds"
+                )
+
+            if time.monotonic() - last_progress > REBROADCAST_AFTER:
+                # nothing was mined for a while, nodes may have dropped some of them
+                self._rebroadcast(list(pending.values()))
+                last_progress = time.monotonic()
+
+            time.sleep(RECEIPT_POLL_INTERVAL)
@@ -25,15 +25,19 @@ class Client(base.BaseContractClient):
             registry.ftso_v2.abi,
         )
 
-    def get_feed_by_id(self, feed_id: bytes) -> FtsoFeed:
-        data = self._contract.functions.getFeedById(feed_id).call()
-
-        return FtsoFeed(
-            value=data[0],
-            decimals=data[1],
-            timestamp=data[2],
+    def get_feed_by_id_call(self, feed_id: bytes) -> base.ReadCall[FtsoFeed]:
+        return base.ReadCall(
+            self._contract.functions.getFeedById(feed_id),
+            lambda data: FtsoFeed(
+                value=data[0],
+                decimals=data[1],
+                timestamp=data[2],
+            ),
         )
 
+    def get_feed_by_id(self, feed_id: bytes) -> FtsoFeed:
+        return self.get_feed_by_id_call(feed_id).call()
+
     def get_feed_xrp_usd(self) -> FtsoFeed:
         return self.get_feed_by_id(XRP_USD_FEED_ID)
 
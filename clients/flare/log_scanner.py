@@ -0,0 +1,165 @@
+import collections
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+import requests
+import web3
+from web3.contract.contract import ContractEvent
+from web3.exceptions import Web3Exception
+from web3.types import EventData
+
+from configuration.trace import trace
+
+# fragments of errors providers return when a eth_getLogs range is too wide or
+# matches too many logs, these are retried with a smaller window
+RANGE_ERROR_FRAGMENTS = (
+    "block range",
+    "range too large",
+    "too many blocks",
+    "query returned more than",
+    "response size exceeded",
+    "max results",
+)
+# fragments of throttling errors, these are retried with the same window after a
+# growing pause, a smaller window would only send more requests
+RATE_LIMIT_FRAGMENTS = (
+    "rate limit",
+    "too many requests",
+    "429",
+)
+# first pause after a throttling error in seconds, doubled up to the max on every
+# further one and given up after that many in a row
+RATE_LIMIT_BACKOFF = 0.5
+RATE_LIMIT_MAX_BACKOFF = 8
+RATE_LIMIT_MAX_RETRIES = 8
+
+
+def _message(e: Exception) -> str:
+    return " ".join(map(str, e.args)).lower()
+
+
+def is_range_error(e: Exception) -> bool:
+    message = _message(e)
+    return any(f in message for f in RANGE_ERROR_FRAGMENTS)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    message = _message(e)
+    return any(f in message for f in RATE_LIMIT_FRAGMENTS)
+
+
+class LogScanner:
+    def __init__(
+        self,
+        client: web3.Web3,
+        window: int = 30,
+        max_window: int = 2048,
+        parallelism: int = 4,
+    ) -> None:
+        self._client = client
+        self._parallelism = parallelism
+
+        # window grows after every successful request until it hits the provider
+        # limit, which is then remembered as the new upper bound
+        self.window = window
+        self.max_window = max_window
+
+        self._head = 0
+        self._rate_limited = 0
+
+    def clamp_to_head(self, to_block: int | None) -> int:
+        # head only moves forward, so it is only asked for when the requested range
+        # could reach past the last known one
+        if to_block is None or to_block > self._head:
+            self._head = self._client.eth.block_number
+
+        if to_block is None:
+            return self._head
+        return min(to_block, self._head)
+
+    def _on_range_error(self, size: int) -> None:
+        self.max_window = min(self.max_window, max(1, size // 2))
+        self.window = min(self.window, self.max_window)
+
+    def _on_rate_limit(self) -> None:
+        self._rate_limited += 1
+        trace.event("log_scan_rate_limited")
+        time.sleep(
+            min(
+                RATE_LIMIT_BACKOFF * 2 ** (self._rate_limited - 1),
+                RATE_LIMIT_MAX_BACKOFF,
+            )
+        )
+
+    def _on_success(self, size: int) -> None:
+        self._rate_limited = 0
+        if size >= self.window:
+            self.window = min(self.window * 2, self.max_window)
+
+    def scan(
+        self,
+        event: ContractEvent,
+        from_block: int,
+        to_block: int | None = None,
+        argument_filters: dict[str, Any] | None = None,
+    ) -> list[EventData]:
+        to_block = self.clamp_to_head(to_block)
+
+        def get_logs(start: int, end: int) -> list[EventData]:
+            return list(
+                event.get_logs(
+                    from_block=start,
+                    to_block=end,
+                    argument_filters=argument_filters,
+                )
+            )
+
+        events: list[EventData] = []
+        retry: collections.deque[tuple[int, int]] = collections.deque()
+        pending: dict[Future[list[EventData]], tuple[int, int]] = {}
+        cursor = from_block
+
+        with ThreadPoolExecutor(self._parallelism) as pool:
+            while retry or pending or cursor <= to_block:
+                while len(pending) < self._parallelism:
+                    if retry:
+                        start, end = retry.popleft()
+                    elif cursor <= to_block:
+                        start, end = cursor, min(cursor + self.window - 1, to_block)
+                        cursor = end + 1
+                    else:
+                        break
+
+                    pending[pool.submit(get_logs, start, end)] = (start, end)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    start, end = pending.pop(future)
+                    size = end - start + 1
+
+                    try:
+                        events.extend(future.result())
+                    except (Web3Exception, ValueError, requests.HTTPError) as e:
+                        if (
+                            is_rate_limit_error(e)
+                            and self._rate_limited < RATE_LIMIT_MAX_RETRIES
+                        ):
+                            self._on_rate_limit()
+                            retry.append((start, end))
+                            continue
+                        if size == 1 or not is_range_error(e):
+                            raise
+
+                        self._on_range_error(size)
+                        trace.event("log_scan_range_retry")
+                        middle = start + size // 2
+                        retry.extend([(start, middle - 1), (middle, end)])
+                        continue
+
+                    self._on_success(size)
+
+        # windows complete out of order
+        events.sort(key=lambda e: (e["blockNumber"], e["logIndex"]))
+        return events
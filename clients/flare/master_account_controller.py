@@ -1,11 +1,21 @@
-from typing import Any, Self
+import functools
+import sys
+from collections.abc import Callable, Sequence
+from typing import Any, Self, TypeVar
 
 import attrs
 from eth_typing import ABI, ChecksumAddress
+from web3.exceptions import ContractLogicError
 from web3.types import EventData, TxParams
 
+import configuration.custom_instruction
 from clients.flare import base, firelight, flare, upshift
+from configuration.cache import JsonFileCache
 from configuration.registry import registry
+from configuration.settings import settings
+from configuration.trace import trace
+
+T = TypeVar("T")
 
 
 class VaultType:
@@ -61,6 +71,7 @@ class Client(base.BaseContractClient):
 
         self._agent_vault_cache: dict[int, AgentVaultInfo] = {}
         self._vault_cache: dict[int, VaultInfo] = {}
+        self._transaction_id_cache: dict[int, str] = {}
 
     @classmethod
     def default(cls) -> Self:
@@ -70,15 +81,52 @@ class Client(base.BaseContractClient):
             registry.master_account_controller.abi,
         )
 
+    # NOTE: fees, provider wallets and vaults change rarely, so they are kept on disk
+    # for `contract_cache_ttl` seconds, `no_cache` skips reading (not writing) them
+
+    @functools.cached_property
+    def _cache(self) -> JsonFileCache:
+        return JsonFileCache(
+            settings.cache_dir / "master-account-controller.json",
+            ttl=settings.contract_cache_ttl,
+        )
+
+    def _cache_key(self, name: str) -> str:
+        return f"{settings.chain_id}:{self.address}:{name}"
+
+    def _cached(self, name: str, read: Callable[[], T]) -> T:
+        key = self._cache_key(name)
+
+        if not settings.no_cache:
+            value = self._cache.get(key)
+            if value is not None:
+                trace.event("contract_cache_hit")
+                return value
+
+        trace.event("contract_cache_miss")
+        value = read()
+        self._cache.set(key, value)
+        return value
+
     # XrplProviderWalletsFacet
 
+    def get_xrpl_provider_wallets_call(self) -> base.ReadCall[list[ChecksumAddress]]:
+        return base.ReadCall(self._contract.functions.getXrplProviderWallets())
+
     def get_xrpl_provider_wallets(self) -> list[ChecksumAddress]:
-        return self._contract.functions.getXrplProviderWallets().call()
+        return self._cached(
+            "xrpl_provider_wallets", self.get_xrpl_provider_wallets_call().call
+        )
 
     # PersonalAccountsFacet
 
+    def get_personal_account_call(
+        self, xrpl_address: str
+    ) -> base.ReadCall[ChecksumAddress]:
+        return base.ReadCall(self._contract.functions.getPersonalAccount(xrpl_address))
+
     def get_personal_account(self, xrpl_address: str) -> ChecksumAddress:
-        return self._contract.functions.getPersonalAccount(xrpl_address).call()
+        return self.get_personal_account_call(xrpl_address).call()
 
     # VaultsFacet
 
@@ -110,7 +158,10 @@ class Client(base.BaseContractClient):
         raise ValueError(f"unknown vault type: {vault.type}")
 
     def get_vaults(self) -> dict[int, VaultInfo]:
-        vaults = self._contract.functions.getVaults().call()
+        vaults = self._cached(
+            "vaults",
+            lambda: [list(v) for v in self._contract.functions.getVaults().call()],
+        )
 
         for i, address, vault_type in zip(vaults[0], vaults[1], vaults[2], strict=True):
             if i in self._vault_cache:
@@ -121,8 +172,31 @@ class Client(base.BaseContractClient):
 
     # InstructionsFeesFacet
 
+    def get_instruction_fee_call(self, instruction: int) -> base.ReadCall[int]:
+        return base.ReadCall(self._contract.functions.getInstructionFee(instruction))
+
     def get_instruction_fee(self, instruction: int) -> int:
-        return self._contract.functions.getInstructionFee(instruction).call()
+        return self._cached(
+            f"instruction_fee:{instruction}",
+            self.get_instruction_fee_call(instruction).call,
+        )
+
+    def get_instruction_fees(self, instructions: Sequence[int]) -> dict[int, int]:
+        # cached fees are taken from disk, the missing ones are read in one batch
+        fees: dict[int, int] = {}
+        if not settings.no_cache:
+            for instruction in instructions:
+                fee = self._cache.get(self._cache_key(f"instruction_fee:{instruction}"))
+                if fee is not None:
+                    fees[instruction] = fee
+
+        missing = [i for i in dict.fromkeys(instructions) if i not in fees]
+        read = self.batch_read([self.get_instruction_fee_call(i) for i in missing])
+        for instruction, fee in zip(missing, read, strict=True):
+            self._cache.set(self._cache_key(f"instruction_fee:{instruction}"), fee)
+            fees[instruction] = fee
+
+        return fees
 
     # AgentVaultsFacet
 
@@ -139,7 +213,10 @@ class Client(base.BaseContractClient):
     # ExecutorsFacet
 
     def get_executor_fee(self) -> int:
-        return self._contract.functions.getExecutorInfo().call()[1]
+        return self._cached(
+            "executor_fee",
+            lambda: self._contract.functions.getExecutorInfo().call()[1],
+        )
 
     # InstructionsFacet
 
@@ -170,17 +247,73 @@ class Client(base.BaseContractClient):
 
     # CustomInstructionsFacet
 
+    def encode_custom_instruction_call(
+        self, custom_instruction: list[dict[str, Any]]
+    ) -> base.ReadCall[bytes]:
+        return base.ReadCall(
+            self._contract.functions.encodeCustomInstruction(custom_instruction)
+        )
+
     def encode_custom_instruction(
         self, custom_instruction: list[dict[str, Any]]
     ) -> bytes:
-        return self._contract.functions.encodeCustomInstruction(
-            custom_instruction
+        return self.encode_custom_instructions([custom_instruction])[0]
+
+    def encode_custom_instructions(
+        self, custom_instructions: Sequence[list[dict[str, Any]]]
+    ) -> list[bytes]:
+        # NOTE: the first instruction is also encoded by the contract to catch a
+        # change in its hashing, in which case all of them are encoded by the
+        # contract in one batch, the only check against the contract as long as
+        # tests/fixtures has no hashes recorded from it
+        hashes = configuration.custom_instruction.encode_custom_instructions(
+            custom_instructions
+        )
+        if not hashes:
+            return []
+        contract_hash = self.encode_custom_instruction_call(
+            custom_instructions[0]
         ).call()
+        if contract_hash == hashes[0]:
+            return hashes
+
+        trace.event("custom_instruction_encoder_mismatch")
+        print(
+            f"warning: local custom instruction hash 0x{hashes[0].hex()} differs from "
+            f"the contract's 0x{contract_hash.hex()}, encoding with the contract",
+            file=sys.stderr,
+        )
+        return self.batch_read(
+            [self.encode_custom_instruction_call(i) for i in custom_instructions]
+        )
 
-    def get_custom_instruction(self, custom_instruction_hash: bytes) -> bytes:
-        return self._contract.functions.getCustomInstruction(
-            custom_instruction_hash
-        ).call()
+    def get_custom_instruction_call(
+        self, custom_instruction_hash: bytes
+    ) -> base.ReadCall[list[Any]]:
+        return base.ReadCall(
+            self._contract.functions.getCustomInstruction(custom_instruction_hash)
+        )
+
+    def get_custom_instruction(self, custom_instruction_hash: bytes) -> list[Any]:
+        return self.get_custom_instruction_call(custom_instruction_hash).call()
+
+    def are_custom_instructions_registered(
+        self, custom_instruction_hashes: Sequence[bytes]
+    ) -> list[bool]:
+        calls = [self.get_custom_instruction_call(h) for h in custom_instruction_hashes]
+
+        try:
+            instructions = self.batch_read(calls)
+        except ContractLogicError:
+            # a revert fails the whole batch, fall back to reading one by one
+            instructions = []
+            for call in calls:
+                try:
+                    instructions.append(call.call())
+                except ContractLogicError:
+                    instructions.append([])
+
+        return [len(i) > 0 for i in instructions]
 
     def register_custom_instruction(
         self, custom_instruction: list[dict[str, Any]]
@@ -200,13 +333,53 @@ class Client(base.BaseContractClient):
             )
         )
 
-    def get_transaction_id_for_collateral_reservation(
+    def get_transaction_id_for_collateral_reservation_call(
         self, collateral_reservation_id: int
-    ) -> str:
-        return (
+    ) -> base.ReadCall[str]:
+        return base.ReadCall(
             self._contract.functions.getTransactionIdForCollateralReservation(
                 collateral_reservation_id
+            ),
+            lambda transaction_id: transaction_id.hex(),
+        )
+
+    def get_transaction_id_for_collateral_reservation(
+        self, collateral_reservation_id: int
+    ) -> str:
+        return self.get_transaction_id_for_collateral_reservation_call(
+            collateral_reservation_id
+        ).call()
+
+    def get_transaction_ids_for_collateral_reservations(
+        self, collateral_reservation_ids: Sequence[int]
+    ) -> list[str]:
+        # NOTE: a transaction id never changes once set, so set ones are memoized
+        # and all unknown ids are read together in one batch
+        missing = [
+            i
+            for i in dict.fromkeys(collateral_reservation_ids)
+            if i not in self._transaction_id_cache
+        ]
+        read = dict(
+            zip(
+                missing,
+                self.batch_read(
+                    [
+                        self.get_transaction_id_for_collateral_reservation_call(i)
+                        for i in missing
+                    ]
+                ),
+                strict=True,
             )
-            .call()
-            .hex()
         )
+
+        self._transaction_id_cache.update(
+            (i, transaction_id)
+            for i, transaction_id in read.items()
+            if int(transaction_id, 16) != 0
+        )
+
+        return [
+            self._transaction_id_cache.get(i) or read[i]
+            for i in collateral_reservation_ids
+        ]
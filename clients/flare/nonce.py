@@ -0,0 +1,64 @@
+import heapq
+import threading
+from collections.abc import Callable
+
+# fragments of errors nodes return when a nonce was already used or is still
+# pending, the local counter is then synced with the node again
+NONCE_ERROR_FRAGMENTS = (
+    "nonce too low",
+    "replacement transaction underpriced",
+)
+# fragments of errors nodes return when they already hold this exact signed
+# transaction, sending it again would only duplicate it under a new nonce
+KNOWN_TX_ERROR_FRAGMENTS = ("already known", "known transaction")
+
+
+def _error_matches(e: Exception, fragments: tuple[str, ...]) -> bool:
+    message = " ".join(map(str, e.args)).lower()
+    return any(f in message for f in fragments)
+
+
+def is_nonce_error(e: Exception) -> bool:
+    return _error_matches(e, NONCE_ERROR_FRAGMENTS)
+
+
+def is_known_tx_error(e: Exception) -> bool:
+    return _error_matches(e, KNOWN_TX_ERROR_FRAGMENTS)
+
+
+class NonceManager:
+    # hands out consecutive nonces of one account to any number of threads, the
+    # node is only asked for the starting nonce and after a nonce error
+    def __init__(self, get_pending_count: Callable[[], int]) -> None:
+        self._get_pending_count = get_pending_count
+        self._lock = threading.Lock()
+
+        self._next: int | None = None
+        # nonces allocated but never accepted by the node, reused lowest first so
+        # no gap blocks the transactions after them
+        self._released: list[int] = []
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+
+            if self._next is None:
+                self._next = self._get_pending_count()
+
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int) -> None:
+        with self._lock:
+            if self._next is not None and nonce < self._next:
+                heapq.heappush(self._released, nonce)
+
+    def resync(self) -> int:
+        with self._lock:
+            pending_count = self._get_pending_count()
+            self._released = [n for n in self._released if n >= pending_count]
+            heapq.heapify(self._released)
+            self._next = max(self._next or 0, pending_count)
+            return pending_count
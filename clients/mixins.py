@@ -1,5 +1,7 @@
 import functools
 
+from clients.flare import base
+
 
 class Erc20ContractMixin:
     @functools.cached_property
@@ -18,5 +20,8 @@ class Erc20ContractMixin:
     def total_supply(self) -> int:
         return self._contract.functions.totalSupply().call()
 
+    def balance_of_call(self, address: str) -> base.ReadCall[int]:
+        return base.ReadCall(self._contract.functions.balanceOf(address))
+
     def balance_of(self, address: str) -> int:
-        return self._contract.functions.balanceOf(address).call()
+        return self.balance_of_call(address).call()
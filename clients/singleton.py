@@ -4,44 +4,60 @@ import attrs
 
 import clients as c
 import configuration.utils
+from configuration.settings import settings
 
 
-@attrs.frozen
+# not slotted, attrs would replace the locked cached properties with its own
+@attrs.frozen(slots=False)
 class ClientsSingleton:
+    # every client is built on first access and then reused, so a command only pays
+    # for the setup calls of clients it actually uses, and built once even when
+    # concurrent requests of `serve` ask for it first
+
     # web3
-    flare: c.FlareClient
-    xrpl: c.XrplClient
+
+    @configuration.utils.locked_cached_property
+    def flare(self) -> c.FlareClient:
+        return c.FlareClient.default()
+
+    @configuration.utils.locked_cached_property
+    def flare_signing(self) -> c.FlareSigningClient:
+        # one instance per process, so every send shares its nonce manager
+        return c.FlareSigningClient.default_with_pk(settings.flr_private_key)
+
+    @configuration.utils.locked_cached_property
+    def xrpl(self) -> c.XrplClient:
+        return c.XrplClient.default()
 
     # smart contracts
-    asset_manager: c.AssetManagerClient
-    ftso_v2: c.FtsoV2Client
-    fxrp: c.FxrpClient
-    flare_contract_registry: c.FlareContractRegistryClient
-    master_account_controller: c.MasterAccountControllerClient
-    wnat: c.WNatClient
+
+    @configuration.utils.locked_cached_property
+    def asset_manager(self) -> c.AssetManagerClient:
+        return c.AssetManagerClient.default()
+
+    @configuration.utils.locked_cached_property
+    def ftso_v2(self) -> c.FtsoV2Client:
+        return c.FtsoV2Client.default()
+
+    @configuration.utils.locked_cached_property
+    def fxrp(self) -> c.FxrpClient:
+        return self.asset_manager.get_fxrp_client()
+
+    @configuration.utils.locked_cached_property
+    def flare_contract_registry(self) -> c.FlareContractRegistryClient:
+        return c.FlareContractRegistryClient.default()
+
+    @configuration.utils.locked_cached_property
+    def master_account_controller(self) -> c.MasterAccountControllerClient:
+        return c.MasterAccountControllerClient.default()
+
+    @configuration.utils.locked_cached_property
+    def wnat(self) -> c.WNatClient:
+        return c.WNatClient.default()
 
     @classmethod
     def default(cls) -> Self:
-        flare = c.FlareClient.default()
-        xrpl = c.XrplClient.default()
-
-        asset_manager = c.AssetManagerClient.default()
-        fxrp = asset_manager.get_fxrp_client()
-        ftso_v2 = c.FtsoV2Client.default()
-        flare_contract_registry = c.FlareContractRegistryClient.default()
-        master_account_controller = c.MasterAccountControllerClient.default()
-        wnat = c.WNatClient.default()
-
-        return cls(
-            flare=flare,
-            xrpl=xrpl,
-            asset_manager=asset_manager,
-            ftso_v2=ftso_v2,
-            fxrp=fxrp,
-            flare_contract_registry=flare_contract_registry,
-            master_account_controller=master_account_controller,
-            wnat=wnat,
-        )
+        return cls()
 
 
 clients = configuration.utils.wrap_singleton(ClientsSingleton.default)
@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator, Sequence
+from typing import Self
+
+from xrpl.asyncio.account import get_next_valid_seq_number
+from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrpl.asyncio.ledger import get_latest_validated_ledger_sequence
+from xrpl.asyncio.transaction import sign, submit_and_wait
+from xrpl.models import Payment, Response, Tx
+from xrpl.models.requests import AccountInfo
+from xrpl.wallet import Wallet
+
+from clients.xrpl.xrpl import (
+    SEND_LOCK,
+    TracedRequestMixin,
+    _build_memos,
+    cache_tx,
+    get_cached_tx,
+)
+from configuration.settings import settings
+
+
+@contextlib.asynccontextmanager
+async def _send_lock() -> AsyncIterator[None]:
+    # the process wide lock of the sync client, waited for without blocking the
+    # event loop (and without leaking it when the wait is cancelled)
+    while not SEND_LOCK.acquire(blocking=False):
+        await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        SEND_LOCK.release()
+
+
+class TracedAsyncJsonRpcClient(TracedRequestMixin, AsyncJsonRpcClient):
+    pass
+
+
+class Client:
+    def __init__(self, rpc_url) -> None:
+        self.client = TracedAsyncJsonRpcClient(rpc_url)
+
+    @classmethod
+    def default(cls) -> Self:
+        return cls(settings.xrpl_rpc_url)
+
+    async def get_balance(self, xrpl_address: str) -> int:
+        response = await self.client.request(AccountInfo(account=xrpl_address))
+        return int(response.result["account_data"]["Balance"])
+
+    async def get_tx(self, tx_hash: str) -> Response:
+        cached = get_cached_tx(tx_hash)
+        if cached is not None:
+            return cached
+        return cache_tx(await self.client.request(Tx(transaction=tx_hash)))
+
+    async def get_txs(self, tx_hashes: Sequence[str]) -> list[Response]:
+        return list(await asyncio.gather(*(self.get_tx(h) for h in tx_hashes)))
+
+    def _get_wallet(self) -> Wallet:
+        return Wallet.from_seed(seed=settings.xrpl_seed)
+
+    async def send_tx(
+        self,
+        amount: str | int,
+        fee: str | int,
+        destination: str,
+        memos: str | list[str] | None,
+        last_ledger_sequence: int | None = None,
+    ) -> Response:
+        wallet = self._get_wallet()
+
+        async with _send_lock():
+            # account sequence and ledger sequence are independent requests
+            if last_ledger_sequence is None:
+                sequence, latest_ledger_sequence = await asyncio.gather(
+                    get_next_valid_seq_number(wallet.address, self.client),
+                    get_latest_validated_ledger_sequence(self.client),
+                )
+                last_ledger_sequence = latest_ledger_sequence + 20
+            else:
+                sequence = await get_next_valid_seq_number(wallet.address, self.client)
+
+            payment_tx = Payment(
+                account=wallet.address,
+                amount=str(amount),
+                destination=destination,
+                memos=_build_memos(memos),
+                last_ledger_sequence=last_ledger_sequence,
+                sequence=sequence,
+                fee=str(fee),
+            )
+
+            payment_response = await submit_and_wait(
+                sign(payment_tx, wallet), self.client
+            )
+        return cache_tx(payment_response)
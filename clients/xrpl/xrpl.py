@@ -1,19 +1,137 @@
+import functools
+import hashlib
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Self
 
+import attrs
 from xrpl.account import get_next_valid_seq_number
-from xrpl.clients import JsonRpcClient
+from xrpl.asyncio.clients.client import REQUEST_TIMEOUT
+from xrpl.clients import JsonRpcClient, XRPLRequestFailureException
 from xrpl.ledger import get_latest_validated_ledger_sequence
 from xrpl.models import Memo, Payment, Response, Tx
-from xrpl.models.requests import AccountInfo
-from xrpl.transaction import sign, submit_and_wait
+from xrpl.models.requests import AccountInfo, Request
+from xrpl.models.response import ResponseStatus
+from xrpl.transaction import sign, submit, submit_and_wait
 from xrpl.wallet import Wallet
 
+from configuration.cache import JsonDirCache
 from configuration.settings import settings
+from configuration.trace import trace
+
+# seconds between checks of pending transactions in `send_txs`
+POLL_INTERVAL = 1
+
+# NOTE: sequence numbers of the configured account are looked up before sending, so
+# every send of the process (sync and async clients, any instance) takes turns
+# until its transactions are submitted
+SEND_LOCK = threading.Lock()
+
+
+@attrs.frozen
+class PaymentParams:
+    amount: str | int
+    fee: str | int
+    destination: str
+    memos: str | list[str] | None
+    # defaults to 20 ledgers after the latest validated one
+    last_ledger_sequence: int | None = None
+
+
+@attrs.frozen
+class PaymentResult:
+    # none when the payment was not sent
+    hash: str | None
+    sequence: int | None
+    # preliminary result of submission, e.g. tesSUCCESS or terQUEUED
+    engine_result: str
+    # final result from the validated ledger, or "expired" / "rejected" /
+    # "not sent"
+    result: str
+    validated: bool
+
+
+def _build_memos(memos: str | list[str] | None) -> list[Memo] | None:
+    if isinstance(memos, str):
+        return [Memo(memo_data=memos)]
+    elif memos is not None:
+        return [Memo(memo_data=m) for m in memos]
+    return None
+
+
+class TracedRequestMixin:
+    # records every request in `trace`, including the ones xrpl-py helpers (e.g.
+    # `submit_and_wait`) send, both sync and async clients go through this
+    async def _request_impl(
+        self, request: Request, *, timeout: float = REQUEST_TIMEOUT
+    ) -> Response:
+        if not trace.enabled:
+            return await super()._request_impl(request, timeout=timeout)  # type: ignore
+
+        start, response = time.perf_counter(), None
+        try:
+            response = await super()._request_impl(request, timeout=timeout)  # type: ignore
+            return response
+        finally:
+            trace.record_call(
+                "xrpl",
+                request.method.value,
+                time.perf_counter() - start,
+                response is None or not response.is_successful(),
+                request.to_dict(),
+                None if response is None else response.result,
+            )
+
+
+class TracedJsonRpcClient(TracedRequestMixin, JsonRpcClient):
+    pass
+
+
+@functools.cache
+def tx_cache() -> JsonDirCache:
+    # validated transactions are immutable, so they are kept by hash without expiry,
+    # per xrpl rpc url so transactions of different networks are never mixed
+    network = hashlib.sha256(settings.xrpl_rpc_url.encode()).hexdigest()[:16]
+    return JsonDirCache(settings.cache_dir / f"xrpl-tx-{network}")
+
+
+def _tx_cache_key(tx_hash: str) -> str | None:
+    key = tx_hash.removeprefix("0x").upper()
+    try:
+        if len(bytes.fromhex(key)) == 32:
+            return key
+    except ValueError:
+        pass
+    return None
+
+
+def get_cached_tx(tx_hash: str) -> Response | None:
+    key = _tx_cache_key(tx_hash)
+    if key is None or settings.no_cache:
+        return None
+
+    result = tx_cache().get(key)
+    if result is None:
+        return None
+    trace.event("xrpl_tx_cache_hit")
+    return Response(status=ResponseStatus.SUCCESS, result=result)
+
+
+def cache_tx(response: Response) -> Response:
+    # only results from a validated ledger are final, anything else may change
+    result = response.result
+    if response.is_successful() and result.get("validated"):
+        key = _tx_cache_key(str(result.get("hash", "")))
+        if key is not None:
+            tx_cache().set(key, result)
+    return response
 
 
 class Client:
     def __init__(self, rpc_url) -> None:
-        self.client = JsonRpcClient(rpc_url)
+        self.client = TracedJsonRpcClient(rpc_url)
 
     @classmethod
     def default(cls) -> Self:
@@ -23,8 +141,19 @@ class Client:
         response = self.client.request(AccountInfo(account=xrpl_address))
         return int(response.result["account_data"]["Balance"])
 
+    def get_validated_ledger_sequence(self) -> int:
+        return get_latest_validated_ledger_sequence(self.client)
+
     def get_tx(self, tx_hash: str) -> Response:
-        return self.client.request(Tx(transaction=tx_hash))
+        cached = get_cached_tx(tx_hash)
+        if cached is not None:
+            return cached
+        return cache_tx(self.client.request(Tx(transaction=tx_hash)))
+
+    def get_txs(self, tx_hashes: Sequence[str]) -> list[Response]:
+        # cached transactions are read from disk, the rest requested in parallel
+        with ThreadPoolExecutor(settings.rpc_pool_size) as pool:
+            return list(pool.map(self.get_tx, tx_hashes))
 
     def _get_wallet(self) -> Wallet:
         return Wallet.from_seed(seed=settings.xrpl_seed)
@@ -44,22 +173,138 @@ class Client:
 
         wallet = self._get_wallet()
 
-        built_memos = None
-
-        if isinstance(memos, str):
-            built_memos = [Memo(memo_data=memos)]
-        elif memos is not None:
-            built_memos = [Memo(memo_data=m) for m in memos]
-
-        payment_tx = Payment(
-            account=wallet.address,
-            amount=str(amount),
-            destination=destination,
-            memos=built_memos,
-            last_ledger_sequence=last_ledger_sequence,
-            sequence=get_next_valid_seq_number(wallet.address, self.client),
-            fee=str(fee),
-        )
-
-        payment_response = submit_and_wait(sign(payment_tx, wallet), self.client)
-        return self.get_tx(payment_response.result["hash"])
+        with SEND_LOCK:
+            payment_tx = Payment(
+                account=wallet.address,
+                amount=str(amount),
+                destination=destination,
+                memos=_build_memos(memos),
+                last_ledger_sequence=last_ledger_sequence,
+                sequence=get_next_valid_seq_number(wallet.address, self.client),
+                fee=str(fee),
+            )
+
+            payment_response = submit_and_wait(sign(payment_tx, wallet), self.client)
+        # the response already is the validated transaction, no need to get it again
+        return cache_tx(payment_response)
+
+    def _submit_payments(
+        self, wallet: Wallet, payments: Sequence[PaymentParams]
+    ) -> tuple[list[PaymentResult], dict[str, int], list[int]]:
+        results: list[PaymentResult] = []
+        pending: dict[str, int] = {}
+        last_ledger_sequences: list[int] = []
+
+        sequence = get_next_valid_seq_number(wallet.address, self.client)
+        latest_ledger, checked_at = 0, 0.0
+
+        for p in payments:
+            # a long batch outlives ledgers, so the default window is kept current
+            if p.last_ledger_sequence is None and (
+                time.monotonic() - checked_at > POLL_INTERVAL
+            ):
+                latest_ledger = get_latest_validated_ledger_sequence(self.client)
+                checked_at = time.monotonic()
+            last_ledger_sequence = p.last_ledger_sequence or latest_ledger + 20
+
+            signed_tx = sign(
+                Payment(
+                    account=wallet.address,
+                    amount=str(p.amount),
+                    destination=p.destination,
+                    memos=_build_memos(p.memos),
+                    last_ledger_sequence=last_ledger_sequence,
+                    sequence=sequence,
+                    fee=str(p.fee),
+                ),
+                wallet,
+            )
+            tx_hash = signed_tx.get_hash()
+            last_ledger_sequences.append(last_ledger_sequence)
+            result = PaymentResult(
+                hash=tx_hash,
+                sequence=sequence,
+                engine_result="",
+                result="",
+                validated=False,
+            )
+
+            try:
+                engine_result = submit(signed_tx, self.client).result["engine_result"]
+            except XRPLRequestFailureException as e:
+                # refused by the server, retrying the rest would most likely fail
+                # the same way (e.g. rate limits)
+                results.append(
+                    attrs.evolve(result, engine_result=str(e.error), result="rejected")
+                )
+                break
+            except Exception:
+                # NOTE: transport errors leave it unknown whether the transaction
+                # reached the server, it is waited for but nothing more is sent
+                results.append(result)
+                pending[tx_hash] = len(results) - 1
+                break
+
+            # tem, tef and tel results are not applied and do not use up the
+            # sequence, tec ones are applied (fee charged) and get a final result
+            if engine_result.startswith(("tem", "tef", "tel")):
+                results.append(
+                    attrs.evolve(result, engine_result=engine_result, result="rejected")
+                )
+                continue
+
+            results.append(attrs.evolve(result, engine_result=engine_result))
+            pending[tx_hash] = len(results) - 1
+            sequence += 1
+
+        return results, pending, last_ledger_sequences
+
+    def send_txs(self, payments: Sequence[PaymentParams]) -> list[PaymentResult]:
+        # NOTE: sequences are assigned locally from one account lookup, so all
+        # payments are signed and submitted back to back and then waited for
+        # together instead of one ledger close each
+        wallet = self._get_wallet()
+
+        with SEND_LOCK:
+            results, pending, last_ledger_sequences = self._submit_payments(
+                wallet, payments
+            )
+
+        # payments after a failed submission were never signed or sent
+        results += [
+            PaymentResult(
+                hash=None,
+                sequence=None,
+                engine_result="",
+                result="not sent",
+                validated=False,
+            )
+            for _ in payments[len(results) :]
+        ]
+
+        checked_ledger = 0
+        while pending:
+            time.sleep(POLL_INTERVAL)
+
+            # pending transactions are only looked up once per new validated ledger
+            latest_ledger = get_latest_validated_ledger_sequence(self.client)
+            if latest_ledger == checked_ledger:
+                continue
+            checked_ledger = latest_ledger
+
+            for tx_hash, i in list(pending.items()):
+                tx = self.get_tx(tx_hash).result
+
+                if tx.get("validated"):
+                    result = tx["meta"]["TransactionResult"]
+                elif latest_ledger > last_ledger_sequences[i]:
+                    result = "expired"
+                else:
+                    continue
+
+                results[i] = attrs.evolve(
+                    results[i], result=result, validated=result != "expired"
+                )
+                del pending[tx_hash]
+
+        return results
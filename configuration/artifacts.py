@@ -0,0 +1,135 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+from typing import Self
+
+import attrs
+from eth_typing import ABI, ABIEvent, ABIFunction
+from eth_utils.crypto import keccak
+
+# bump when the layout of the cached data changes
+CACHE_VERSION = 1
+CACHE_DIR = Path("./artifacts/.cache")
+
+
+def event_signature(event_abi: ABIEvent) -> str:
+    assert "inputs" in event_abi
+    params = ""
+    for index, input in enumerate(event_abi["inputs"]):
+        if index > 0:
+            params += ","
+
+        if input["type"] == "tuple[]":
+            params += "("
+            assert "components" in input
+            for index2, tuple_component in enumerate(input["components"]):
+                if index2 > 0:
+                    params += ","
+
+                params += tuple_component["type"]
+
+            params += ")[]"
+
+        elif input["type"] == "tuple":
+            params += "("
+            assert "components" in input
+            for index2, tuple_component in enumerate(input["components"]):
+                if index2 > 0:
+                    params += ","
+
+                params += tuple_component["type"]
+
+            params += ")"
+
+        else:
+            params += input["type"]
+
+    return keccak(text=event_abi["name"] + "(" + params + ")").hex()
+
+
+def function_signature(function_name: str) -> str:
+    return keccak(text=function_name).hex()[:8]
+
+
+def function_full_name(function_abi: ABIFunction) -> str:
+    assert "name" in function_abi and "inputs" in function_abi
+    inputs = [i["type"] for i in function_abi["inputs"]]
+    return f"{function_abi['name']}({','.join(inputs)})"
+
+
+@attrs.frozen
+class CompiledArtifact:
+    abi: ABI
+    # event name -> topic
+    topics: dict[str, str]
+    # function name -> selector
+    selectors: dict[str, str]
+
+    @classmethod
+    def compile(cls, abi: ABI) -> Self:
+        topics = {}
+        selectors = {}
+        for entry in abi:
+            assert "type" in entry
+            if entry["type"] == "event":
+                assert "name" in entry
+                topics[entry["name"]] = event_signature(entry)
+            elif entry["type"] == "function":
+                assert "name" in entry
+                selectors[entry["name"]] = function_signature(function_full_name(entry))
+
+        return cls(abi=abi, topics=topics, selectors=selectors)
+
+
+def _cache_path(file_location: str, raw: bytes) -> Path:
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return CACHE_DIR / f"{Path(file_location).stem}-v{CACHE_VERSION}-{digest}.pickle"
+
+
+def compile_artifact(file_location: str) -> CompiledArtifact:
+    raw = Path(file_location).read_bytes()
+    compiled = CompiledArtifact.compile(json.loads(raw)["abi"])
+
+    cache_path = _cache_path(file_location, raw)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # written aside and moved in place, a concurrent first run never reads a
+    # partly written file
+    tmp = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(pickle.dumps(attrs.asdict(compiled, recurse=False)))
+    os.replace(tmp, cache_path)
+
+    return compiled
+
+
+@functools.cache
+def load_artifact(file_location: str) -> CompiledArtifact:
+    # NOTE: hashing the artifact is much cheaper than parsing it, so the cache is
+    # keyed by content and a changed artifact is simply compiled again
+    raw = Path(file_location).read_bytes()
+
+    try:
+        cached = pickle.loads(_cache_path(file_location, raw).read_bytes())
+        return CompiledArtifact(**cached)
+    except Exception:
+        # missing, truncated or from another layout, the cache is keyed by content
+        # so it is only ever fixed by compiling again
+        pass
+
+    try:
+        return compile_artifact(file_location)
+    except OSError:
+        # read only checkout, compile in memory
+        return CompiledArtifact.compile(json.loads(raw)["abi"])
+
+
+if __name__ == "__main__":
+    # python -m configuration.artifacts [artifacts/*.json]
+    file_locations = sys.argv[1:] or sorted(Path("./artifacts").glob("*.json"))
+    for file_location in map(str, file_locations):
+        compile_artifact(file_location)
+        print(f"compiled {file_location}")
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import attrs
+
+# serializes read-modify-write of cache files between threads of one process
+_lock = threading.Lock()
+
+
+@attrs.frozen
+class JsonFileCache:
+    # single json file holding {key: {"t": stored at, "v": value}}
+    path: Path
+    # seconds after which entries are stale, None never expires
+    ttl: float | None = None
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: dict[str, Any]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            # cache is best effort, a read only home should not break commands
+            pass
+
+    def get(self, key: str) -> Any | None:
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+
+        if self.ttl is not None and time.time() - entry["t"] > self.ttl:
+            return None
+
+        return entry["v"]
+
+    def set(self, key: str, value: Any) -> None:
+        with _lock:
+            data = self._read()
+            data[key] = {"t": time.time(), "v": value}
+            self._write(data)
+
+    def invalidate(self, key: str | None = None) -> None:
+        with _lock:
+            if key is None:
+                self._write({})
+                return
+
+            data = self._read()
+            if data.pop(key, None) is not None:
+                self._write(data)
+
+
+@attrs.frozen
+class JsonDirCache:
+    # one json file per key under a directory, for many entries that never change,
+    # each is written once instead of rewriting a single growing file
+    path: Path
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Any | None:
+        try:
+            with open(self._file(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        file = self._file(key)
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, file)
+        except OSError:
+            pass
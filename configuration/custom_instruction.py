@@ -0,0 +1,63 @@
+import functools
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from eth_abi.registry import registry as abi_registry
+from eth_utils.abi import collapse_if_tuple
+from eth_utils.address import to_checksum_address
+from eth_utils.crypto import keccak
+from hexbytes import HexBytes
+
+from configuration.artifacts import load_artifact
+
+MASTER_ACCOUNT_CONTROLLER_ARTIFACT = "./artifacts/IMasterAccountController.json"
+# CustomInstructions.CustomCall[], the layout `_normalize` produces
+CUSTOM_INSTRUCTION_TYPE = "(address,uint256,bytes)[]"
+
+
+@functools.cache
+def _encoder() -> Callable[[Any], bytes]:
+    # the argument type is read from the contract abi, so a changed struct in the
+    # artifact fails here instead of silently producing different hashes
+    abi = load_artifact(MASTER_ACCOUNT_CONTROLLER_ARTIFACT).abi
+    fn = next(
+        e
+        for e in abi
+        if e["type"] == "function" and e.get("name") == "encodeCustomInstruction"
+    )
+    assert "inputs" in fn
+    (argument,) = fn["inputs"]
+
+    type_str = collapse_if_tuple(dict(argument))
+    if type_str != CUSTOM_INSTRUCTION_TYPE:
+        raise ValueError(f"unexpected custom instruction type {type_str}")
+
+    # encoding of the argument list, the same bytes abi.encode produces
+    return abi_registry.get_encoder(f"({type_str})")
+
+
+def _normalize(custom_instruction: list[dict[str, Any]]) -> list[tuple]:
+    return [
+        (
+            to_checksum_address(c["targetContract"]),
+            int(c["value"]),
+            bytes(HexBytes(c["data"])),
+        )
+        for c in custom_instruction
+    ]
+
+
+def encode_custom_instructions(
+    custom_instructions: Sequence[list[dict[str, Any]]],
+) -> list[bytes]:
+    # NOTE: local equivalent of `encodeCustomInstruction`, keccak of the abi encoded
+    # calls with the top two bytes cleared (the rest is the 30 byte call hash
+    # instructions reference), the encoder is built once for all of them
+    encode = _encoder()
+    return [
+        bytes(2) + keccak(encode((_normalize(i),)))[2:] for i in custom_instructions
+    ]
+
+
+def encode_custom_instruction(custom_instruction: list[dict[str, Any]]) -> bytes:
+    return encode_custom_instructions([custom_instruction])[0]
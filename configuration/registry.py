@@ -1,58 +1,20 @@
-import json
+import functools
 from typing import Self
 
 import attrs
-from attrs import field, frozen
+from attrs import frozen
 from eth_typing import ABI, ABIEvent, ABIFunction, ChecksumAddress
 from eth_utils.address import to_checksum_address
-from web3 import Web3
-from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware
 
 import configuration.utils
+from configuration import rpc
+from configuration.artifacts import function_full_name, load_artifact
+from configuration.cache import JsonFileCache
 from configuration.settings import settings
 
 
-def abi_from_file_location(file_location: str):
-    return json.load(open(file_location))["abi"]
-
-
-def event_signature(event_abi: ABIEvent) -> str:
-    assert "inputs" in event_abi
-    params = ""
-    for index, input in enumerate(event_abi["inputs"]):
-        if index > 0:
-            params += ","
-
-        if input["type"] == "tuple[]":
-            params += "("
-            assert "components" in input
-            for index2, tuple_component in enumerate(input["components"]):
-                if index2 > 0:
-                    params += ","
-
-                params += tuple_component["type"]
-
-            params += ")[]"
-
-        elif input["type"] == "tuple":
-            params += "("
-            assert "components" in input
-            for index2, tuple_component in enumerate(input["components"]):
-                if index2 > 0:
-                    params += ","
-
-                params += tuple_component["type"]
-
-            params += ")"
-
-        else:
-            params += input["type"]
-
-    return Web3.keccak(text=event_abi["name"] + "(" + params + ")").hex()
-
-
-def function_signature(function_name: str) -> str:
-    return Web3.keccak(text=function_name).hex()[:8]
+def abi_from_file_location(file_location: str) -> ABI:
+    return load_artifact(file_location).abi
 
 
 @frozen
@@ -60,10 +22,7 @@ class Event:
     name: str
     abi: ABIEvent
     contract: "Contract"
-    signature: str = field(init=False)
-
-    def __attrs_post_init__(self):
-        object.__setattr__(self, "signature", event_signature(self.abi))
+    signature: str
 
 
 @frozen
@@ -71,53 +30,79 @@ class Function:
     name: str
     abi: ABIFunction
     contract: "Contract"
-    signature: str = field(init=False)
+    signature: str
 
     def to_full_name(self):
-        assert "inputs" in self.abi
-        inputs = [i["type"] for i in self.abi["inputs"]]
-        return f"{self.name}({','.join(inputs)})"
-
-    def __attrs_post_init__(self):
-        object.__setattr__(self, "signature", function_signature(self.to_full_name()))
+        return function_full_name(self.abi)
 
 
 @frozen
 class Contract:
     name: str
     address: ChecksumAddress
-    abi: ABI = field(converter=abi_from_file_location)
-    events: dict[str, Event] = field(init=False)
-    functions: dict[str, Function] = field(init=False)
+    # path to hardhat artifact, abi is loaded from the compiled cache on first use
+    artifact: str
+
+    @property
+    def abi(self) -> ABI:
+        return load_artifact(self.artifact).abi
 
-    def __attrs_post_init__(self):
+    @functools.cached_property
+    def events(self) -> dict[str, Event]:
+        compiled = load_artifact(self.artifact)
         events = {}
-        functions = {}
-        for entry in self.abi:
+        for entry in compiled.abi:
             assert "type" in entry
             if entry["type"] == "event":
                 assert "name" in entry
-                events[entry["name"]] = Event(entry["name"], entry, self)
-            elif entry["type"] == "function":
+                events[entry["name"]] = Event(
+                    entry["name"], entry, self, compiled.topics[entry["name"]]
+                )
+        return events
+
+    @functools.cached_property
+    def functions(self) -> dict[str, Function]:
+        compiled = load_artifact(self.artifact)
+        functions = {}
+        for entry in compiled.abi:
+            assert "type" in entry
+            if entry["type"] == "function":
                 assert "name" in entry
-                functions[entry["name"]] = Function(entry["name"], entry, self)
-        object.__setattr__(self, "events", events)
-        object.__setattr__(self, "functions", functions)
+                functions[entry["name"]] = Function(
+                    entry["name"], entry, self, compiled.selectors[entry["name"]]
+                )
+        return functions
 
 
 @attrs.frozen
 class AbiRegistry:
     # mock vault
-    my_erc_4626: ABI = field(converter=abi_from_file_location)
+    my_erc_4626_artifact: str
 
     # for fxrp
-    erc_20: ABI = field(converter=abi_from_file_location)
+    erc_20_artifact: str
 
     # firelight style abi
-    firelight: ABI = field(converter=abi_from_file_location)
+    firelight_artifact: str
 
     # upshift style abi
-    upshift: ABI = field(converter=abi_from_file_location)
+    upshift_artifact: str
+
+    @property
+    def my_erc_4626(self) -> ABI:
+        return abi_from_file_location(self.my_erc_4626_artifact)
+
+    @property
+    def erc_20(self) -> ABI:
+        return abi_from_file_location(self.erc_20_artifact)
+
+    @property
+    def firelight(self) -> ABI:
+        return abi_from_file_location(self.firelight_artifact)
+
+    @property
+    def upshift(self) -> ABI:
+        return abi_from_file_location(self.upshift_artifact)
 
 
 @attrs.frozen
@@ -126,25 +111,78 @@ class Registry:
 
     flare_contract_registry: Contract
 
+    # contracts below are resolved on first access, so a command only pays for the
+    # lookups of contracts it actually uses
+
+    @functools.cached_property
+    def _addresses(self) -> dict[str, ChecksumAddress]:
+        # NOTE: addresses of official contracts practically never change, so they are
+        # resolved with a single multi-name call and kept on disk per chain
+        names = ["AssetManagerFXRP", "FtsoV2", "WNat"]
+        cache = JsonFileCache(
+            settings.cache_dir / "registry.json", ttl=settings.registry_cache_ttl
+        )
+        cache_key = str(settings.chain_id)
+
+        addresses: dict[str, str] | None = None
+        if not settings.refresh_registry:
+            addresses = cache.get(cache_key)
+
+        if addresses is None or not set(names) <= addresses.keys():
+            resolved = (
+                rpc.web3_client(settings.flr_rpc_url)
+                .eth.contract(
+                    address=self.flare_contract_registry.address,
+                    abi=self.flare_contract_registry.abi,
+                )
+                .functions.getContractAddressesByName(names)
+                .call()
+            )
+            addresses = dict(zip(names, resolved, strict=True))
+            cache.set(cache_key, addresses)
+
+        return {k: to_checksum_address(v) for k, v in addresses.items()}
+
     # smart accounts
-    master_account_controller: Contract
+    @functools.cached_property
+    def master_account_controller(self) -> Contract:
+        return Contract(
+            name="MasterAccountController",
+            address=to_checksum_address(
+                settings.chain_config.master_account_controller
+            ),
+            artifact="./artifacts/IMasterAccountController.json",
+        )
 
     # asset manager
-    asset_manager: Contract
+    @functools.cached_property
+    def asset_manager(self) -> Contract:
+        return Contract(
+            name="AssetManagerFXRP",
+            address=self._addresses["AssetManagerFXRP"],
+            artifact="./artifacts/IIAssetManager.json",
+        )
 
     # ftso
-    ftso_v2: Contract
+    @functools.cached_property
+    def ftso_v2(self) -> Contract:
+        return Contract(
+            name="FtsoV2",
+            address=self._addresses["FtsoV2"],
+            artifact="./artifacts/FtsoV2Interface.json",
+        )
 
     # wnat
-    wnat: Contract
+    @functools.cached_property
+    def wnat(self) -> Contract:
+        return Contract(
+            name="WNat",
+            address=self._addresses["WNat"],
+            artifact="./artifacts/IWNat.json",
+        )
 
     @classmethod
     def default(cls) -> Self:
-        client = Web3(
-            provider=Web3.HTTPProvider(settings.flr_rpc_url),
-            middleware=(ExtraDataToPOAMiddleware,),
-        )
-
         # NOTE:(janezicmatej) FlareContractRegistry smart contract always provides an up
         # to date mapper ({name:address}) for all official Flare contracts. It is
         # deployed on all 4 chains on the SAME address and is guaranteed to never be
@@ -155,49 +193,14 @@ class Registry:
             "./artifacts/FlareContractRegistry.json",
         )
 
-        def get_address_by_name(name: str) -> ChecksumAddress:
-            return to_checksum_address(
-                client.eth.contract(
-                    address=flare_contract_registry.address,
-                    abi=flare_contract_registry.abi,
-                )
-                .functions.getContractAddressByName(name)
-                .call()
-            )
-
         return cls(
             abis=AbiRegistry(
-                my_erc_4626="./artifacts/MyERC4626.json",
-                erc_20="./artifacts/IErc20.json",
-                firelight="./artifacts/FirelightVault.json",
-                upshift="./artifacts/UpshiftLendingPool.json",
+                my_erc_4626_artifact="./artifacts/MyERC4626.json",
+                erc_20_artifact="./artifacts/IErc20.json",
+                firelight_artifact="./artifacts/FirelightVault.json",
+                upshift_artifact="./artifacts/UpshiftLendingPool.json",
             ),
             flare_contract_registry=flare_contract_registry,
-            # smart accounts
-            master_account_controller=Contract(
-                name="MasterAccountController",
-                address=to_checksum_address(
-                    settings.chain_config.master_account_controller
-                ),
-                abi="./artifacts/IMasterAccountController.json",
-            ),
-            # asset manager
-            asset_manager=Contract(
-                name="AssetManagerFXRP",
-                address=get_address_by_name("AssetManagerFXRP"),
-                abi="./artifacts/IIAssetManager.json",
-            ),
-            # ftso
-            ftso_v2=Contract(
-                name="FtsoV2",
-                address=get_address_by_name("FtsoV2"),
-                abi="./artifacts/FtsoV2Interface.json",
-            ),
-            wnat=Contract(
-                name="WNat",
-                address=get_address_by_name("WNat"),
-                abi="./artifacts/IWNat.json",
-            ),
         )
 
 
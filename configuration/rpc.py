@@ -0,0 +1,153 @@
+import functools
+import time
+from typing import Any
+
+import aiohttp
+import requests
+import web3
+from requests.adapters import HTTPAdapter
+from web3 import AsyncHTTPProvider, AsyncWeb3, middleware
+from web3.middleware.base import Web3Middleware
+
+from configuration.settings import settings
+from configuration.trace import trace
+
+
+def _is_error(response: Any) -> bool:
+    return not isinstance(response, (dict, list)) or (
+        isinstance(response, dict) and "error" in response
+    )
+
+
+class TraceMiddleware(Web3Middleware):
+    # records every request in `trace` (a batch as one "batch" call), innermost so
+    # the time is that of the provider round trip
+    def wrap_make_request(self, make_request: Any) -> Any:
+        def middleware(method: Any, params: Any) -> Any:
+            if not trace.enabled:
+                return make_request(method, params)
+
+            start, response = time.perf_counter(), None
+            try:
+                response = make_request(method, params)
+                return response
+            finally:
+                seconds = time.perf_counter() - start
+                error = _is_error(response)
+                trace.record_call("flare", method, seconds, error, params, response)
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request: Any) -> Any:
+        def middleware(requests_info: Any) -> Any:
+            if not trace.enabled:
+                return make_batch_request(requests_info)
+
+            start, response = time.perf_counter(), None
+            try:
+                response = make_batch_request(requests_info)
+                return response
+            finally:
+                seconds = time.perf_counter() - start
+                error = _is_error(response)
+                trace.record_call(
+                    "flare", "batch", seconds, error, requests_info, response
+                )
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request: Any) -> Any:
+        async def middleware(method: Any, params: Any) -> Any:
+            if not trace.enabled:
+                return await make_request(method, params)
+
+            start, response = time.perf_counter(), None
+            try:
+                response = await make_request(method, params)
+                return response
+            finally:
+                seconds = time.perf_counter() - start
+                error = _is_error(response)
+                trace.record_call("flare", method, seconds, error, params, response)
+
+        return middleware
+
+    async def async_wrap_make_batch_request(self, make_batch_request: Any) -> Any:
+        async def middleware(requests_info: Any) -> Any:
+            if not trace.enabled:
+                return await make_batch_request(requests_info)
+
+            start, response = time.perf_counter(), None
+            try:
+                response = await make_batch_request(requests_info)
+                return response
+            finally:
+                seconds = time.perf_counter() - start
+                error = _is_error(response)
+                trace.record_call(
+                    "flare", "batch", seconds, error, requests_info, response
+                )
+
+        return middleware
+
+
+@functools.cache
+def http_provider(rpc_url: str) -> web3.HTTPProvider:
+    # one keep-alive connection pool per rpc url, shared by every web3 instance
+    adapter = HTTPAdapter(
+        pool_connections=settings.rpc_pool_size,
+        pool_maxsize=settings.rpc_pool_size,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return web3.HTTPProvider(
+        rpc_url,
+        request_kwargs={"timeout": settings.rpc_timeout},
+        session=session,
+    )
+
+
+def new_web3_client(rpc_url: str) -> web3.Web3:
+    client = web3.Web3(http_provider(rpc_url))
+    client.middleware_onion.inject(
+        middleware.ExtraDataToPOAMiddleware,
+        layer=0,
+    )
+    client.middleware_onion.remove("gas_price_strategy")
+    client.middleware_onion.remove("gas_estimate")
+    # validation asks for eth_chainId before every call and transaction, the chain
+    # id of signed transactions comes from the (cached) fee oracle instead
+    client.middleware_onion.remove("validation")
+    client.middleware_onion.inject(TraceMiddleware, "trace", layer=0)
+    return client
+
+
+@functools.cache
+def web3_client(rpc_url: str) -> web3.Web3:
+    # shared read only instance, clients that add middleware should use
+    # `new_web3_client` so they do not leak it to everyone else
+    return new_web3_client(rpc_url)
+
+
+def new_async_web3_client(rpc_url: str) -> AsyncWeb3:
+    # NOTE: aiohttp sessions are bound to the event loop they were created on, so
+    # async clients are not cached across `asyncio.run` calls
+    client = AsyncWeb3(
+        AsyncHTTPProvider(
+            rpc_url,
+            request_kwargs={"timeout": aiohttp.ClientTimeout(settings.rpc_timeout)},
+        )
+    )
+    client.middleware_onion.inject(
+        middleware.ExtraDataToPOAMiddleware,
+        layer=0,
+    )
+    client.middleware_onion.remove("gas_price_strategy")
+    client.middleware_onion.remove("gas_estimate")
+    # validation asks for eth_chainId before every call and transaction, the chain
+    # id of signed transactions comes from the (cached) fee oracle instead
+    client.middleware_onion.remove("validation")
+    client.middleware_onion.inject(TraceMiddleware, "trace", layer=0)
+    return client
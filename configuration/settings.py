@@ -1,11 +1,11 @@
+import functools
 import os
+from pathlib import Path
 from typing import Self
 
 import attrs
-import web3
 from eth_typing import ChecksumAddress
 from eth_utils.address import to_checksum_address
-from web3 import middleware
 
 import configuration.utils
 
@@ -49,39 +49,87 @@ class ChainConfig:
 
 @attrs.frozen(kw_only=True)
 class Settings:
-    flr_rpc_url: str
-    xrpl_rpc_url: str
+    deployment_name: str | None
+    # when set chain config is resolved offline, without asking the rpc
+    chain_id_override: int | None
 
-    flr_private_key: str
-    xrpl_seed: str
+    # everything below is resolved on first access so that offline commands
+    # (encode, decode) never need rpc urls, secrets or network
 
-    chain_config: ChainConfig
+    @functools.cached_property
+    def flr_rpc_url(self) -> str:
+        return os.environ["FLR_RPC_URL"]
+
+    @functools.cached_property
+    def xrpl_rpc_url(self) -> str:
+        return os.environ["XRPL_RPC_URL"]
+
+    @functools.cached_property
+    def flr_private_key(self) -> str:
+        return os.environ["FLR_PRIVATE_KEY"]
+
+    @functools.cached_property
+    def xrpl_seed(self) -> str:
+        return os.environ["XRPL_SECRET"]
+
+    @functools.cached_property
+    def rpc_pool_size(self) -> int:
+        return int(os.getenv("RPC_POOL_SIZE", 10))
+
+    @functools.cached_property
+    def rpc_timeout(self) -> float:
+        return float(os.getenv("RPC_TIMEOUT", 30))
+
+    @functools.cached_property
+    def cache_dir(self) -> Path:
+        if cache_dir := os.getenv("SMART_ACCOUNTS_CACHE_DIR"):
+            return Path(cache_dir).expanduser()
+
+        cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(cache_home) / "smart-accounts"
+
+    @functools.cached_property
+    def registry_cache_ttl(self) -> int:
+        return int(os.getenv("REGISTRY_CACHE_TTL", 24 * 60 * 60))
+
+    @functools.cached_property
+    def refresh_registry(self) -> bool:
+        return bool(os.getenv("REFRESH_REGISTRY"))
+
+    @functools.cached_property
+    def contract_cache_ttl(self) -> int:
+        return int(os.getenv("CONTRACT_CACHE_TTL", 60 * 60))
+
+    @functools.cached_property
+    def no_cache(self) -> bool:
+        return bool(os.getenv("NO_CACHE"))
+
+    @functools.cached_property
+    def serve_token(self) -> str | None:
+        return os.getenv("SMART_ACCOUNTS_SERVE_TOKEN")
+
+    @functools.cached_property
+    def chain_id(self) -> int:
+        if self.chain_id_override is not None:
+            return self.chain_id_override
+
+        from configuration import rpc
+
+        return rpc.web3_client(self.flr_rpc_url).eth.chain_id
+
+    @functools.cached_property
+    def chain_config(self) -> ChainConfig:
+        return ChainConfig.from_chain_id(self.chain_id, self.deployment_name)
 
     @classmethod
     def default(cls) -> Self:
         # TODO:(@janezicmatej) read all possible env variables for any mode of running
         # here instaead of django.conf.settigns
-        deployment_name = os.getenv("DEPLOYMENT_NAME")
-        flr_rpc_url = os.environ["FLR_RPC_URL"]
-        xrpl_rpc_url = os.environ["XRPL_RPC_URL"]
-
-        flr_private_key = os.environ["FLR_PRIVATE_KEY"]
-        xrpl_seed = os.environ["XRPL_SECRET"]
-
-        client = web3.Web3(web3.Web3.HTTPProvider(flr_rpc_url))
-        client.middleware_onion.inject(
-            middleware.ExtraDataToPOAMiddleware,
-            layer=0,
-        )
-
-        chain_id = client.eth.chain_id
+        chain_id = os.getenv("CHAIN_ID")
 
         return cls(
-            flr_rpc_url=flr_rpc_url,
-            xrpl_rpc_url=xrpl_rpc_url,
-            flr_private_key=flr_private_key,
-            xrpl_seed=xrpl_seed,
-            chain_config=ChainConfig.from_chain_id(chain_id, deployment_name),
+            deployment_name=os.getenv("DEPLOYMENT_NAME"),
+            chain_id_override=int(chain_id) if chain_id else None,
         )
 
 
@@ -0,0 +1,188 @@
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections.abc import Awaitable, Iterator
+from typing import Any, TypeVar
+
+import attrs
+
+T = TypeVar("T")
+
+
+@attrs.define
+class Stats:
+    count: int = 0
+    errors: int = 0
+    seconds: float = 0
+    max_seconds: float = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+
+    def add(
+        self,
+        seconds: float,
+        error: bool = False,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+    ) -> None:
+        self.count += 1
+        self.errors += error
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+
+    def asdict(self, sizes: bool = True) -> dict[str, Any]:
+        d = {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.seconds * 1000, 3),
+            "avg_ms": round(self.seconds * 1000 / max(self.count, 1), 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+        if sizes:
+            d["request_bytes"] = self.request_bytes
+            d["response_bytes"] = self.response_bytes
+        return d
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str))
+
+
+class Trace:
+    # NOTE: aggregates timings of every rpc call (recorded by the web3 middleware
+    # and the xrpl client) and of handler phases, nothing is measured until it is
+    # enabled by `--trace` or `serve`
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+        self.calls: dict[tuple[str, str], Stats] = {}
+        self.spans: dict[str, Stats] = {}
+        self.events: dict[str, int] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._started = time.monotonic()
+
+    def record_call(
+        self,
+        system: str,
+        method: str,
+        seconds: float,
+        error: bool,
+        request: Any,
+        response: Any,
+    ) -> None:
+        # sizes are of the json payloads, close to the bytes on the wire
+        request_bytes = _json_size(request)
+        response_bytes = 0 if response is None else _json_size(response)
+
+        with self._lock:
+            stats = self.calls.setdefault((system, method), Stats())
+            stats.add(seconds, error, request_bytes, response_bytes)
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.spans.setdefault(name, Stats()).add(seconds, error)
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        # span around one awaitable, so concurrently gathered phases are timed apart
+        with self.span(name):
+            return await awaitable
+
+    def event(self, name: str) -> None:
+        # retries and other things worth counting that are not calls
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + 1
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            calls = sorted(self.calls.items(), key=lambda i: -i[1].seconds)
+            return {
+                "wall_ms": round((time.monotonic() - self._started) * 1000, 3),
+                "rpc": [
+                    {"system": system, "method": method, **stats.asdict()}
+                    for (system, method), stats in calls
+                ],
+                "spans": {
+                    name: stats.asdict(sizes=False)
+                    for name, stats in self.spans.items()
+                },
+                "events": dict(self.events),
+            }
+
+    def write_summary(self, path: str) -> None:
+        data = json.dumps(self.summary(), indent=2)
+        if path == "-":
+            print(data, file=sys.stderr)
+        else:
+            with open(path, "w") as f:
+                f.write(data + "\n")
+
+    def openmetrics(self) -> str:
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"')
+
+        lines = []
+
+        def family(name: str, help: str, samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# TYPE smart_accounts_{name} counter")
+            lines.append(f"# HELP smart_accounts_{name} {help}")
+            for labels, value in samples:
+                lines.append(f"smart_accounts_{name}_total{{{labels}}} {value}")
+
+        with self._lock:
+            calls = [
+                (f'system="{escape(s)}",method="{escape(m)}"', stats)
+                for (s, m), stats in self.calls.items()
+            ]
+            spans = [(f'span="{escape(n)}"', stats) for n, stats in self.spans.items()]
+            events = [(f'name="{escape(n)}"', v) for n, v in self.events.items()]
+
+        family("rpc_calls", "rpc requests sent", [(k, s.count) for k, s in calls])
+        family("rpc_errors", "rpc requests failed", [(k, s.errors) for k, s in calls])
+        family("rpc_seconds", "time spent in rpc", [(k, s.seconds) for k, s in calls])
+        family(
+            "rpc_request_bytes",
+            "json bytes sent",
+            [(k, s.request_bytes) for k, s in calls],
+        )
+        family(
+            "rpc_response_bytes",
+            "json bytes received",
+            [(k, s.response_bytes) for k, s in calls],
+        )
+        family("span_calls", "handler phases run", [(k, s.count) for k, s in spans])
+        family(
+            "span_seconds",
+            "time spent in handler phases",
+            [(k, s.seconds) for k, s in spans],
+        )
+        family("events", "retries and other events", events)
+        lines.append("# EOF")
+
+        return "\n".join(lines) + "\n"
+
+
+trace = Trace()
+
+__all__ = ["trace"]
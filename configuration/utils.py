@@ -1,5 +1,7 @@
+import functools
+import threading
 from collections.abc import Callable
-from typing import Generic, TypeVar, cast
+from typing import Any, Generic, TypeVar, cast
 
 T = TypeVar("T")
 
@@ -8,10 +10,15 @@ class Singleton(Generic[T]):
     def __init__(self, factory: Callable[[], T]) -> None:
         self.factory = factory
         self.inner: T | None = None
+        # requests of `serve` can be the first to touch it concurrently, they all
+        # get the same instance
+        self._lock = threading.Lock()
 
     def __getattr__(self, *args, **kwargs):
         if self.inner is None:
-            self.inner = self.factory()
+            with self._lock:
+                if self.inner is None:
+                    self.inner = self.factory()
 
         return getattr(self.inner, *args, **kwargs)
 
@@ -19,3 +26,20 @@ class Singleton(Generic[T]):
 def wrap_singleton(factory: Callable[[], T]) -> T:
     wrapper = Singleton(factory)
     return cast(T, wrapper)
+
+
+class locked_cached_property(functools.cached_property):  # noqa: N801
+    # cached_property that builds its value once even when first accessed from
+    # several threads at the same time (the stdlib one does not lock since 3.12)
+    def __init__(self, func: Callable[[Any], Any]) -> None:
+        super().__init__(func)
+        self._build_lock = threading.RLock()
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        if self.attrname in instance.__dict__:
+            return instance.__dict__[self.attrname]
+
+        with self._build_lock:
+            return super().__get__(instance, owner)
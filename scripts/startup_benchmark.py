@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Measures import time of every subcommand with `python -X importtime` and fails
+# when the median of several runs goes over its budget.
+#
+#   ./scripts/startup_benchmark.py [-n RUNS]
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+REFERENCE = "0x0088000000000000000000010001000000000000000000000000000000000000"
+
+# web3 and xrpl-py, which every network handler needs, most of their import time is
+# eth_account setting up py_ecc and can not be avoided by the handlers
+DEPENDENCIES = ["-c", "import web3, xrpl.models, xrpl.clients"]
+
+# name, interpreter arguments, import time budget in milliseconds and whether the
+# budget is on top of the import time of DEPENDENCIES (measured in the same run,
+# so it holds on slower machines too)
+#
+# bridge and custom handlers can not run without network access so only their
+# modules are imported, on top of what every command already pays for the parser.
+# Their own overhead is about 300 ms, so a new heavy import goes over the budget
+BENCHMARKS: list[tuple[str, list[str], int, bool]] = [
+    ("help", ["smart_accounts.py", "--help"], 750, False),
+    (
+        "encode",
+        "smart_accounts.py --chain-id 114 encode fxrp-cr -w 1 -v 1 -a 1".split(),
+        750,
+        False,
+    ),
+    ("decode", ["smart_accounts.py", "decode", REFERENCE], 750, False),
+    ("bridge", ["-c", "import smart_accounts, src.handlers.bridge"], 500, True),
+    ("custom", ["-c", "import smart_accounts, src.handlers.custom"], 500, True),
+]
+
+
+def import_time_ms(argv: list[str]) -> float:
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if p.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited with {p.returncode}: {p.stderr}")
+
+    total_us = 0
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        total_us += int(line.removeprefix("import time:").split("|")[0])
+
+    return total_us / 1000
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser()
+    argp.add_argument("-n", "--runs", type=int, default=5, help="runs per command")
+    args = argp.parse_args()
+
+    def median_ms(argv: list[str]) -> float:
+        return statistics.median(import_time_ms(argv) for _ in range(args.runs))
+
+    dependencies = median_ms(DEPENDENCIES)
+    print(f"{'deps':<8} {dependencies:>8.1f} ms")
+
+    failed = False
+    for name, argv, budget, over_dependencies in BENCHMARKS:
+        if over_dependencies:
+            budget += round(dependencies)
+        median = median_ms(argv)
+        status = "ok" if median <= budget else "OVER BUDGET"
+        failed |= median > budget
+        print(f"{name:<8} {median:>8.1f} ms  (budget {budget} ms)  {status}")
+
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
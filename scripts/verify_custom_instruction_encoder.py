@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Compares the local custom instruction encoder with the contract's
+# `encodeCustomInstruction` on generated instructions and, optionally, on a file
+# with one custom instruction json per line. Needs FLR_RPC_URL (and CHAIN_ID or
+# network access to resolve the deployment). With `--record` the contract's hashes
+# are written as the fixture of tests/test_custom_instruction.py.
+#
+#   ./scripts/verify_custom_instruction_encoder.py [-f FILE] [-n COUNT] [-r FILE]
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+import dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clients.singleton import clients as c
+from configuration.custom_instruction import encode_custom_instructions
+
+
+def generated(count: int, seed: int) -> list[list[dict[str, Any]]]:
+    # edge cases first: zero values, empty and word aligned calldata, many calls
+    rng = random.Random(seed)
+    sizes = [0, 1, 31, 32, 33, 64, 1000]
+
+    instructions = []
+    for i in range(count):
+        instructions.append(
+            [
+                {
+                    "targetContract": "0x" + rng.randbytes(20).hex(),
+                    "value": rng.choice([0, 1, 2**256 - 1, rng.getrandbits(128)]),
+                    "data": "0x" + rng.randbytes(sizes[(i + j) % len(sizes)]).hex(),
+                }
+                for j in range(1 + i % 5)
+            ]
+        )
+
+    return instructions
+
+
+def main() -> None:
+    argp = argparse.ArgumentParser()
+    argp.add_argument("-f", "--file", type=str, default=None, help="jsonl file")
+    argp.add_argument("-n", "--count", type=int, default=50, help="generated cases")
+    argp.add_argument("-s", "--seed", type=int, default=0)
+    argp.add_argument(
+        "-r", "--record", type=str, default=None, help="write contract hashes as jsonl"
+    )
+    args = argp.parse_args()
+
+    dotenv.load_dotenv()
+    mac = c.master_account_controller
+
+    instructions = generated(args.count, args.seed)
+    if args.file is not None:
+        with open(args.file) as f:
+            instructions.extend(json.loads(line) for line in f if line.strip())
+
+    local = encode_custom_instructions(instructions)
+    remote = mac.batch_read(
+        [mac.encode_custom_instruction_call(i) for i in instructions]
+    )
+
+    mismatches = 0
+    for instruction, a, b in zip(instructions, local, remote, strict=True):
+        if a != b:
+            mismatches += 1
+            print(f"mismatch: local {a.hex()} contract {b.hex()}")
+            print(f"  {json.dumps(instruction)}")
+
+    if args.record is not None:
+        with open(args.record, "w") as f:
+            for instruction, b in zip(instructions, remote, strict=True):
+                row = {"instruction": instruction, "hash": b.hex()}
+                f.write(json.dumps({**row, "source": "contract"}))
+                f.write("\n")
+
+    print(f"{len(instructions) - mismatches}/{len(instructions)} match")
+    if mismatches:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
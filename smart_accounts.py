@@ -1,11 +1,12 @@
 #!/usr/bin/env python
-from collections.abc import Callable
-from typing import Any, TypeVar
+import os
+from typing import Any
 
 import dotenv
 
-from src import cli, handlers
-from src.cli import types as ct
+from configuration.trace import trace
+from src import cli
+from src.cli import resolver
 
 
 def not_implemented(args: Any) -> int | None:
@@ -14,72 +15,37 @@ def not_implemented(args: Any) -> int | None:
     return 2
 
 
-T = TypeVar("T", bound=ct.NamespaceSerializer)
-ResolverFn = tuple[type[T], Callable[[T], int | None]]
-Resolver = dict[str, ResolverFn]
-
-
 def smart_accounts() -> None:
     args = cli.get_parser().parse_args()
 
-    resolver: dict[str, Resolver | ResolverFn] = {
-        "encode": {
-            "fxrp-cr": (ct.EncodeFxrpCr, handlers.encode.encode_omni),
-            "fxrp-transfer": (ct.EncodeFxrpTransfer, handlers.encode.encode_omni),
-            "fxrp-redeem": (ct.EncodeFxrpRedeem, handlers.encode.encode_omni),
-            "firelight-cr-deposit": (
-                ct.EncodeFirelightCrDeposit,
-                handlers.encode.encode_omni,
-            ),
-            "firelight-deposit": (
-                ct.EncodeFirelightDeposit,
-                handlers.encode.encode_omni,
-            ),
-            "firelight-redeem": (ct.EncodeFirelightRedeem, handlers.encode.encode_omni),
-            "firelight-claim-withdraw": (
-                ct.EncodeFirelightClaimWithdraw,
-                handlers.encode.encode_omni,
-            ),
-            "upshift-cr-deposit": (
-                ct.EncodeUpshiftCrDeposit,
-                handlers.encode.encode_omni,
-            ),
-            "upshift-deposit": (ct.EncodeUpshiftDeposit, handlers.encode.encode_omni),
-            "upshift-request-redeem": (
-                ct.EncodeUpshiftRequestRedeem,
-                handlers.encode.encode_omni,
-            ),
-            "upshift-claim": (ct.EncodeUpshiftClaim, handlers.encode.encode_omni),
-            "custom-instruction": (
-                ct.EncodeCustomInstruction,
-                handlers.encode.encode_omni,
-            ),
-        },
-        "decode": (ct.DecodeInstruction, handlers.decode.decode_instruction),
-        "bridge": {
-            "instruction": (ct.BridgeInstruction, handlers.bridge.bridge_instruction),
-            "mint-tx": (ct.BridgeMintTx, handlers.bridge.bridge_mint_tx),
-        },
-        "custom": {
-            "register": (ct.CustomRegister, handlers.custom.custom_register),
-        },
-    }
-
-    r = resolver.get(args.command, {})
-    if isinstance(r, dict):
-        r = r.get(args.subcommand)
-
+    # global flags override the environment that settings are read from
+    if args.chain_id is not None:
+        os.environ["CHAIN_ID"] = str(args.chain_id)
+    if args.deployment_name is not None:
+        os.environ["DEPLOYMENT_NAME"] = args.deployment_name
+    if args.refresh_registry:
+        os.environ["REFRESH_REGISTRY"] = "1"
+    if args.no_cache:
+        os.environ["NO_CACHE"] = "1"
+    tracing = args.trace or args.trace_file is not None
+    if tracing:
+        trace.enable()
+
+    r = resolver.resolve(args.command, getattr(args, "subcommand", None))
     if r is None:
         exit(not_implemented(args))
 
-    serializer, resolver_fn = r
-    # try:
-    exit_code = resolver_fn(serializer.from_namespace(args))
-    if exit_code is not None:
-        exit(exit_code)
+    try:
+        exit_code = resolver.run(r, args)
     # except ValueError as e:
     #     print(f"error: {', '.join(map(str, e.args))}", file=sys.stderr)
     #     exit(2)
+    finally:
+        if tracing:
+            trace.write_summary(args.trace_file or "-")
+
+    if exit_code is not None:
+        exit(exit_code)
 
 
 def main() -> None:
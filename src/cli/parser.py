@@ -1,5 +1,4 @@
 import argparse
-import datetime
 
 import attrs
 
@@ -17,6 +16,7 @@ from src.cli.types import (
     EncodeUpshiftDeposit,
     EncodeUpshiftRequestRedeem,
     NamespaceSerializer,
+    field_parser,
 )
 
 
@@ -42,13 +42,10 @@ def _apply_arguments(argp: argparse.ArgumentParser, acls: type[NamespaceSerializ
 
         args.append(f"--{a.name.replace('_', '-')}")
 
-        type = a.type
+        type = field_parser(a)
         if type is None:
             return
 
-        if type in [datetime.date]:
-            type = int
-
         argp.add_argument(
             *args,
             type=type,
@@ -61,6 +58,46 @@ def _apply_arguments(argp: argparse.ArgumentParser, acls: type[NamespaceSerializ
 def get_parser() -> argparse.ArgumentParser:
     cli = argparse.ArgumentParser(prog="smart_accounts")
     cli.add_argument("--version", "-V", action="version", version="%(prog)s v0.1.0")
+    cli.add_argument(
+        "--chain-id",
+        type=int,
+        default=None,
+        help="chain id to use instead of asking the rpc (env CHAIN_ID)",
+    )
+    cli.add_argument(
+        "--deployment-name",
+        type=str,
+        default=None,
+        help="smart accounts deployment name (env DEPLOYMENT_NAME)",
+    )
+    cli.add_argument(
+        "--refresh-registry",
+        action="store_true",
+        help="ignore cached contract addresses and resolve them again",
+    )
+    cli.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="read cached contract values (fees, wallets, vaults) again",
+    )
+    cli.add_argument(
+        "--async",
+        action="store_true",
+        dest="use_async",
+        help="run bridge commands on the asyncio client stack",
+    )
+    cli.add_argument(
+        "--trace",
+        action="store_true",
+        help="print a json summary of rpc calls and handler phases to stderr",
+    )
+    cli.add_argument(
+        "--trace-file",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="write the --trace summary to a file instead",
+    )
 
     subcli = cli.add_subparsers(
         title="command", required=True, dest="command", metavar=""
@@ -125,9 +162,44 @@ def get_parser() -> argparse.ArgumentParser:
     )
     _apply_arguments(e_custominstruction, EncodeCustomInstruction)
 
+    e_batch = e_subcli.add_parser(
+        "batch", help="encode many instructions from jsonl or csv rows"
+    )
+    e_batch.add_argument(
+        "-f",
+        "--format",
+        choices=["jsonl", "csv"],
+        default="jsonl",
+        help="format of input rows",
+    )
+    e_batch.add_argument(
+        "-w",
+        "--wallet-id",
+        type=int,
+        default=None,
+        help="wallet id to encode with, skips chain config resolution",
+    )
+    e_batch.add_argument(
+        "file",
+        type=str,
+        help="file with one instruction per row (subcommand and fields) or - for stdin",
+    )
+
     d_cli = subcli.add_parser("decode", help="decode instructions")
     d_cli.add_argument(
-        "instruction", type=str, help="hex encoded instruction to decode or - for stdin"
+        "-b",
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="file with one instruction per line or - for stdin, decoded to jsonl",
+    )
+    d_cli.add_argument(
+        "instruction",
+        type=str,
+        nargs="?",
+        default=None,
+        help="hex encoded instruction to decode or - for stdin",
     )
 
     # bridge
@@ -136,9 +208,19 @@ def get_parser() -> argparse.ArgumentParser:
     b_subcli = b_cli.add_subparsers(required=True, dest="subcommand", metavar="")
 
     b_deposit = b_subcli.add_parser("instruction", help="send bridge request")
+    b_deposit.add_argument(
+        "-b",
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="file with one instruction per line or - for stdin, sent pipelined",
+    )
     b_deposit.add_argument(
         "instruction",
         type=str,
+        nargs="?",
+        default=None,
         help="hex encoded bridge instruction to send or - for stdin",
     )
 
@@ -151,9 +233,19 @@ def get_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="wait for operator to perform collateral reservation",
     )
+    b_deposit.add_argument(
+        "-b",
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="file with one bridge transaction hash per line or - for stdin",
+    )
     b_deposit.add_argument(
         "xrpl_hash",
         type=str,
+        nargs="?",
+        default=None,
         help="hex encoded bridge transaction to mint for or - for stdin",
     )
 
@@ -163,10 +255,74 @@ def get_parser() -> argparse.ArgumentParser:
     c_subcli = c_cli.add_subparsers(required=True, dest="subcommand", metavar="")
 
     c_register = c_subcli.add_parser("register", help="register custom instruction")
+    c_register.add_argument(
+        "-b",
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="file with one custom instruction json per line or - for stdin",
+    )
     c_register.add_argument(
         "custom_instruction",
         type=str,
+        nargs="?",
+        default=None,
         help="custom instruction json to send or - for stdin",
     )
 
+    # index
+    i_cli = subcli.add_parser("index", help="local event index related commands")
+
+    i_subcli = i_cli.add_subparsers(required=True, dest="subcommand", metavar="")
+
+    i_sync = i_subcli.add_parser(
+        "sync", help="index smart account related events into the local database"
+    )
+    i_sync.add_argument(
+        "-f",
+        "--from-block",
+        type=int,
+        required=True,
+        help="first block to index",
+    )
+    i_sync.add_argument(
+        "-t",
+        "--to-block",
+        type=int,
+        default=None,
+        help="last block to index, defaults to latest",
+    )
+    i_sync.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep indexing new blocks as they are produced",
+    )
+
+    # serve
+    s_cli = subcli.add_parser(
+        "serve", help="serve the commands as a local json api over http"
+    )
+    s_cli.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="address to listen on",
+    )
+    s_cli.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8765,
+        help="port to listen on",
+    )
+    s_cli.add_argument(
+        "-u",
+        "--unix-socket",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="listen on a unix socket instead of host and port",
+    )
+
     return cli
@@ -0,0 +1,110 @@
+import importlib
+from collections.abc import Callable, Coroutine, Iterator
+from typing import Any, TypeVar
+
+from src.cli import types as ct
+
+T = TypeVar("T", bound=ct.NamespaceSerializer)
+# handlers are referenced as "module:function" and imported only when selected, so
+# each subcommand pays just for the dependencies of its own handler
+ResolverFn = tuple[type[T], str]
+Resolver = dict[str, ResolverFn]
+
+# handler modules with an asyncio variant (same function names), used with `--async`
+ASYNC_HANDLERS = {
+    "src.handlers.bridge": "src.handlers.bridge_aio",
+}
+
+RESOLVER: dict[str, Resolver | ResolverFn] = {
+    "encode": {
+        "fxrp-cr": (ct.EncodeFxrpCr, "src.handlers.encode:encode_omni"),
+        "fxrp-transfer": (ct.EncodeFxrpTransfer, "src.handlers.encode:encode_omni"),
+        "fxrp-redeem": (ct.EncodeFxrpRedeem, "src.handlers.encode:encode_omni"),
+        "firelight-cr-deposit": (
+            ct.EncodeFirelightCrDeposit,
+            "src.handlers.encode:encode_omni",
+        ),
+        "firelight-deposit": (
+            ct.EncodeFirelightDeposit,
+            "src.handlers.encode:encode_omni",
+        ),
+        "firelight-redeem": (
+            ct.EncodeFirelightRedeem,
+            "src.handlers.encode:encode_omni",
+        ),
+        "firelight-claim-withdraw": (
+            ct.EncodeFirelightClaimWithdraw,
+            "src.handlers.encode:encode_omni",
+        ),
+        "upshift-cr-deposit": (
+            ct.EncodeUpshiftCrDeposit,
+            "src.handlers.encode:encode_omni",
+        ),
+        "upshift-deposit": (
+            ct.EncodeUpshiftDeposit,
+            "src.handlers.encode:encode_omni",
+        ),
+        "upshift-request-redeem": (
+            ct.EncodeUpshiftRequestRedeem,
+            "src.handlers.encode:encode_omni",
+        ),
+        "upshift-claim": (ct.EncodeUpshiftClaim, "src.handlers.encode:encode_omni"),
+        "custom-instruction": (
+            ct.EncodeCustomInstruction,
+            "src.handlers.encode:encode_omni",
+        ),
+        "batch": (ct.EncodeBatch, "src.handlers.encode:encode_batch"),
+    },
+    "decode": (ct.DecodeInstruction, "src.handlers.decode:decode_instruction"),
+    "bridge": {
+        "instruction": (
+            ct.BridgeInstruction,
+            "src.handlers.bridge:bridge_instruction",
+        ),
+        "mint-tx": (ct.BridgeMintTx, "src.handlers.bridge:bridge_mint_tx"),
+    },
+    "custom": {
+        "register": (ct.CustomRegister, "src.handlers.custom:custom_register"),
+    },
+    "index": {
+        "sync": (ct.IndexSync, "src.handlers.index:index_sync"),
+    },
+    "serve": (ct.Serve, "src.handlers.serve:serve"),
+}
+
+
+def load_handler(path: str) -> Callable[[Any], int | None]:
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def routes() -> Iterator[tuple[str, ResolverFn]]:
+    # "command/subcommand" (or just "command") for every handler
+    for command, r in RESOLVER.items():
+        if isinstance(r, dict):
+            for subcommand, fn in r.items():
+                yield f"{command}/{subcommand}", fn
+        else:
+            yield command, r
+
+
+def resolve(command: str, subcommand: str | None) -> ResolverFn | None:
+    r = RESOLVER.get(command, {})
+    if isinstance(r, dict):
+        return r.get(subcommand)  # type: ignore
+    return r
+
+
+def run(r: ResolverFn, args: Any) -> int | None:
+    serializer, handler_path = r
+    if args.use_async:
+        module, _, name = handler_path.partition(":")
+        handler_path = f"{ASYNC_HANDLERS.get(module, module)}:{name}"
+
+    resolver_fn = load_handler(handler_path)
+    exit_code = resolver_fn(serializer.from_namespace(args))
+    if isinstance(exit_code, Coroutine):
+        import asyncio
+
+        exit_code = asyncio.run(exit_code)
+    return exit_code
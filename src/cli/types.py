@@ -1,17 +1,22 @@
 import argparse
+import csv
+import datetime
 import json
 import sys
-from collections.abc import Callable
-from typing import Any, Self, TypeVar
+from collections.abc import Callable, Iterator, Mapping
+from typing import TYPE_CHECKING, Any, Self, TypeVar, cast
 
 import attrs
 from py_flare_common.smart_accounts import encoder
-from web3.types import Wei
 
+if TYPE_CHECKING:
+    # importing web3 costs about a second, it is only needed for the type
+    from web3.types import Wei
 
-def value_parser(value: str | Wei) -> Wei:
+
+def value_parser(value: "str | Wei") -> "Wei":
     try:
-        return Wei(int(value))
+        return cast("Wei", int(value))
     except ValueError:
         pass
 
@@ -19,13 +24,13 @@ def value_parser(value: str | Wei) -> Wei:
 
     if value.endswith("wei"):
         try:
-            return Wei(int(value.removesuffix("wei")))
+            return cast("Wei", int(value.removesuffix("wei")))
         except ValueError:
             pass
 
     if value.endswith("flr"):
         try:
-            return Wei(int(value.removesuffix("flr")) * 10**18)
+            return cast("Wei", int(value.removesuffix("flr")) * 10**18)
         except ValueError:
             pass
 
@@ -51,6 +56,19 @@ def str_or_stdin(s: str) -> str:
     return s
 
 
+def call_hash_converter(s: str | list[dict[str, Any]]) -> str:
+    if isinstance(s, str):
+        s = str_or_stdin(s)
+        if not s.lstrip().startswith("["):
+            return s
+        s = json.loads(s)
+
+    # custom instruction calls are hashed locally into their call hash
+    from configuration.custom_instruction import encode_custom_instruction
+
+    return "0x" + encode_custom_instruction(s)[2:].hex()
+
+
 def json_read_file_or_stdin(path: str | None) -> Any:
     if path is None:
         return []
@@ -63,12 +81,48 @@ def json_read_file_or_stdin(path: str | None) -> Any:
     return json.load(file)
 
 
+def rows_read_file_or_stdin(path: str, format: str) -> Iterator[dict[str, Any]]:
+    if path == "-":
+        file = sys.stdin
+    else:
+        file = open(path)
+
+    if format == "csv":
+        for row in csv.DictReader(file):
+            # csv rows carry the union of all columns, empty cells are not set
+            yield {k: v for k, v in row.items() if v not in (None, "")}
+        return
+
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def lines_read_file_or_stdin(path: str) -> Iterator[str]:
+    if path == "-":
+        file = sys.stdin
+    else:
+        file = open(path)
+
+    for line in file:
+        line = line.strip()
+        if line:
+            yield line
+
+
 def bytes_parser(b: str | bytes) -> bytes:
     if isinstance(b, bytes):
         return b
     return bytes.fromhex(b.removeprefix("0x"))
 
 
+def field_parser(a: attrs.Attribute) -> Callable[[Any], Any] | None:
+    if a.type in [datetime.date]:
+        return int
+    return a.type
+
+
 class NamespaceSerializer:
     @classmethod
     def from_namespace(cls, namespace: argparse.Namespace) -> Self:
@@ -80,6 +134,31 @@ class NamespaceSerializer:
             }
         )
 
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Any]) -> Self:
+        kwargs = {}
+
+        a: attrs.Attribute
+        for a in cls.__attrs_attrs__:  # type: ignore
+            if not a.init:
+                continue
+
+            name = a.name
+            if name not in mapping:
+                name = a.name.replace("_", "-")
+            if name not in mapping:
+                raise ValueError(f"missing field {a.name}")
+
+            value = mapping[name]
+            parser = field_parser(a)
+            # structured json values (e.g. custom instruction calls) go to the
+            # field converter as they are
+            if parser is not None and not isinstance(value, list | dict):
+                value = parser(value)
+            kwargs[a.name] = value
+
+        return cls(**kwargs)
+
 
 @attrs.frozen(kw_only=True)
 class Encode:
@@ -146,7 +225,7 @@ class EncodeUpshiftRequestRedeem(
 
 @attrs.frozen(kw_only=True)
 class EncodeCustomInstruction(Encode, encoder.CustomInstruction, NamespaceSerializer):
-    call_hash: str = attrs.field(converter=str_or_stdin)
+    call_hash: str = attrs.field(converter=call_hash_converter)
 
 
 @attrs.frozen(kw_only=True)
@@ -154,6 +233,29 @@ class EncodeUpshiftClaim(Encode, encoder.UpshiftClaim, NamespaceSerializer):
     pass
 
 
+@attrs.frozen(kw_only=True)
+class EncodeBatch(Encode, NamespaceSerializer):
+    file: str
+    format: str
+    wallet_id: int | None
+
+
+ENCODE_INSTRUCTIONS: dict[str, type[NamespaceSerializer]] = {
+    "fxrp-cr": EncodeFxrpCr,
+    "fxrp-transfer": EncodeFxrpTransfer,
+    "fxrp-redeem": EncodeFxrpRedeem,
+    "firelight-cr-deposit": EncodeFirelightCrDeposit,
+    "firelight-deposit": EncodeFirelightDeposit,
+    "firelight-redeem": EncodeFirelightRedeem,
+    "firelight-claim-withdraw": EncodeFirelightClaimWithdraw,
+    "upshift-cr-deposit": EncodeUpshiftCrDeposit,
+    "upshift-deposit": EncodeUpshiftDeposit,
+    "upshift-request-redeem": EncodeUpshiftRequestRedeem,
+    "upshift-claim": EncodeUpshiftClaim,
+    "custom-instruction": EncodeCustomInstruction,
+}
+
+
 @attrs.frozen(kw_only=True)
 class Decode:
     pass
@@ -161,7 +263,11 @@ class Decode:
 
 @attrs.frozen(kw_only=True)
 class DecodeInstruction(Decode, NamespaceSerializer):
-    instruction: str = attrs.field(converter=str_or_stdin)
+    # instruction is not used (and may be omitted) when a batch file is passed
+    batch: str | None
+    instruction: str | None = attrs.field(
+        converter=attrs.converters.optional(str_or_stdin)
+    )
 
 
 @attrs.frozen(kw_only=True)
@@ -179,13 +285,23 @@ def hexstr_validator(instance: Any, attribute: attrs.Attribute, value: str) -> N
 
 @attrs.frozen(kw_only=True)
 class BridgeInstruction(Bridge, NamespaceSerializer):
-    instruction: str = attrs.field(validator=hexstr_validator, converter=str_or_stdin)
+    # instruction is not used (and may be omitted) when a batch file is passed
+    batch: str | None
+    instruction: str | None = attrs.field(
+        validator=attrs.validators.optional(hexstr_validator),
+        converter=attrs.converters.optional(str_or_stdin),
+    )
 
 
 @attrs.frozen(kw_only=True)
 class BridgeMintTx(Bridge, NamespaceSerializer):
     wait: bool
-    xrpl_hash: str = attrs.field(validator=hexstr_validator, converter=str_or_stdin)
+    # xrpl hash is not used (and may be omitted) when a batch file is passed
+    batch: str | None
+    xrpl_hash: str | None = attrs.field(
+        validator=attrs.validators.optional(hexstr_validator),
+        converter=attrs.converters.optional(str_or_stdin),
+    )
 
 
 @attrs.frozen(kw_only=True)
@@ -195,4 +311,29 @@ class Custom:
 
 @attrs.frozen(kw_only=True)
 class CustomRegister(Custom, NamespaceSerializer):
-    custom_instruction: str = attrs.field(converter=str_or_stdin)
+    # custom instruction is not used (and may be omitted) when a batch file is passed
+    batch: str | None
+    custom_instruction: str | None = attrs.field(
+        converter=attrs.converters.optional(str_or_stdin)
+    )
+
+
+@attrs.frozen(kw_only=True)
+class Index:
+    pass
+
+
+@attrs.frozen(kw_only=True)
+class IndexSync(Index, NamespaceSerializer):
+    from_block: int
+    to_block: int | None
+    follow: bool
+
+
+@attrs.frozen(kw_only=True)
+class Serve(NamespaceSerializer):
+    host: str
+    port: int
+    unix_socket: str | None
+    # global `--async`, applies to every request
+    use_async: bool
@@ -1 +0,0 @@
-from . import bridge, custom, decode, encode
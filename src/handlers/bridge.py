@@ -1,75 +1,145 @@
+import json
 import sys
 import time
 
-from py_flare_common.smart_accounts.encoder import decoder
+import attrs
+from py_flare_common.smart_accounts.encoder import decoder, exceptions
 from xrpl.utils import ripple_time_to_posix
 
+from clients.flare.asset_manager import CollateralReserved
+from clients.flare.event_index import CollateralReservedWatcher, event_index
 from clients.singleton import clients as c
-from src.cli.types import BridgeInstruction, BridgeMintTx
+from clients.xrpl.xrpl import PaymentParams
+from configuration.trace import trace
+from src.cli.types import BridgeInstruction, BridgeMintTx, lines_read_file_or_stdin
 
 
 def bridge_instruction(args: BridgeInstruction):
+    if args.batch is not None:
+        return bridge_instruction_batch(args)
+    if args.instruction is None:
+        raise ValueError("instruction or --batch is required")
+
     mac = c.master_account_controller
     x = c.xrpl
 
     instruction_cls = decoder.Decoder.with_all_instructions().decode(args.instruction)
     instruction_cls.decode(args.instruction)
 
-    fee = mac.get_instruction_fee(instruction_cls.INSTRUCTION_ID)
+    with trace.span("fees"):
+        fee = mac.get_instruction_fee(instruction_cls.INSTRUCTION_ID)
+        wallets = mac.get_xrpl_provider_wallets()
 
-    tx = x.send_tx(
-        amount=fee,
-        fee="10",
-        destination=mac.get_xrpl_provider_wallets()[0],
-        memos=args.instruction.removeprefix("0x"),
-    )
+    with trace.span("submit"):
+        tx = x.send_tx(
+            amount=fee,
+            fee="10",
+            destination=wallets[0],
+            memos=args.instruction.removeprefix("0x"),
+        )
 
     print(f"sent bridge instruction transaction: {tx.result['hash']}", file=sys.stderr)
     print(tx.result["hash"])
 
 
+def bridge_instruction_batch(args: BridgeInstruction):
+    assert args.batch is not None
+    mac = c.master_account_controller
+    x = c.xrpl
+
+    d = decoder.Decoder.with_all_instructions()
+    instructions = list(lines_read_file_or_stdin(args.batch))
+
+    instruction_ids = []
+    for n, instruction in enumerate(instructions, 1):
+        try:
+            instruction_cls = d.decode(instruction)
+            instruction_cls.decode(instruction)
+        except (ValueError, exceptions.DecodeError) as e:
+            raise ValueError(f"line {n}: {', '.join(map(str, e.args))}") from e
+        instruction_ids.append(instruction_cls.INSTRUCTION_ID)
+
+    # fees missing from the cache are read in one batch for all instruction ids
+    with trace.span("fees"):
+        fee_by_id = mac.get_instruction_fees(instruction_ids)
+        wallets = mac.get_xrpl_provider_wallets()
+
+    with trace.span("submit"):
+        results = x.send_txs(
+            [
+                PaymentParams(
+                    amount=fee_by_id[instruction_id],
+                    fee="10",
+                    destination=wallets[0],
+                    memos=instruction.removeprefix("0x"),
+                )
+                for instruction, instruction_id in zip(
+                    instructions, instruction_ids, strict=True
+                )
+            ]
+        )
+
+    for instruction, result in zip(instructions, results, strict=True):
+        print(json.dumps({"instruction": instruction, **attrs.asdict(result)}))
+
+    succeeded = sum(r.result == "tesSUCCESS" for r in results)
+    print(
+        f"sent bridge instruction transactions: {succeeded}/{len(results)} succeeded",
+        file=sys.stderr,
+    )
+    if succeeded != len(results):
+        return 1
+
+
 def bridge_mint_tx(args: BridgeMintTx):
+    if args.batch is not None:
+        return bridge_mint_tx_batch(args)
+    if args.xrpl_hash is None:
+        raise ValueError("xrpl hash or --batch is required")
+
     mac = c.master_account_controller
     am = c.asset_manager
     f = c.flare
     x = c.xrpl
 
-    xrpl_tx = x.get_tx(args.xrpl_hash.removeprefix("0x")).result
+    with trace.span("xrpl_get_tx"):
+        xrpl_tx = x.get_tx(args.xrpl_hash.removeprefix("0x")).result
 
     xrpl_time = ripple_time_to_posix(xrpl_tx["tx_json"]["date"])
     # subst 90 seconds to account for possible network time lag
-    flare_block = f.find_block_near_timestamp(xrpl_time - 90)
+    with trace.span("block_search"):
+        flare_block = f.find_block_near_timestamp(xrpl_time - 90)
 
-    minter = mac.get_personal_account(xrpl_tx["tx_json"]["Account"])
+    with trace.span("personal_account"):
+        minter = mac.get_personal_account(xrpl_tx["tx_json"]["Account"])
 
-    crts = am.find_collateral_reserved_events(
-        minter, flare_block, flare_block + 10 * 60
+    xrpl_hash = args.xrpl_hash.removeprefix("0x").upper()
+    watcher = CollateralReservedWatcher(
+        event_index, am, flare_block, flare_block + 10 * 60, minter=minter
     )
 
-    crt = None
-    for _c in crts:
-        mapped_hash = mac.get_transaction_id_for_collateral_reservation(
-            _c.collateral_reservation_id
-        ).upper()
+    def find_crt() -> CollateralReserved | None:
+        # only reservations from blocks not scanned by a previous poll are checked,
+        # all of them resolved in one batch
+        with trace.span("log_scan"):
+            reservations = watcher.poll()
+        with trace.span("match"):
+            mapped_hashes = mac.get_transaction_ids_for_collateral_reservations(
+                [_c.collateral_reservation_id for _c in reservations]
+            )
+
+        for _c, mapped_hash in zip(reservations, mapped_hashes, strict=True):
+            if mapped_hash.upper() == xrpl_hash:
+                return _c
 
-        if mapped_hash.upper() == args.xrpl_hash.upper():
-            crt = _c
-            break
+        return None
+
+    crt = find_crt()
 
     if crt is None and args.wait:
         for _ in range(12):
             time.sleep(5)
-            crts = am.find_collateral_reserved_events(
-                minter, flare_block, flare_block + 10 * 60
-            )
-            for _c in crts:
-                mapped_hash = mac.get_transaction_id_for_collateral_reservation(
-                    _c.collateral_reservation_id
-                ).upper()
-
-                if mapped_hash.upper() == args.xrpl_hash.upper():
-                    crt = _c
-                    break
+            crt = find_crt()
 
             if crt is not None:
                 break
@@ -78,13 +148,147 @@ def bridge_mint_tx(args: BridgeMintTx):
         print("could not find matching CollateralReserved event", file=sys.stderr)
         return
 
-    tx = x.send_tx(
-        amount=crt.value_uba + crt.fee_uba,
-        fee=10,
-        destination=crt.payment_address,
-        memos=crt.payment_reference.hex(),
-        last_ledger_sequence=crt.last_underlying_block,
-    )
+    with trace.span("submit"):
+        tx = x.send_tx(
+            amount=crt.value_uba + crt.fee_uba,
+            fee=10,
+            destination=crt.payment_address,
+            memos=crt.payment_reference.hex(),
+            last_ledger_sequence=crt.last_underlying_block,
+        )
 
     print(f"sent mint tx: {tx.result['hash']}", file=sys.stderr)
     print(tx.result["hash"])
+
+
+def _read_xrpl_hashes(path: str) -> list[str]:
+    xrpl_hashes: list[str] = []
+    for n, line in enumerate(lines_read_file_or_stdin(path), 1):
+        xrpl_hash = line.removeprefix("0x").upper()
+        try:
+            bytes.fromhex(xrpl_hash)
+        except ValueError as e:
+            raise ValueError(f"line {n}: must be a valid hex string") from e
+        xrpl_hashes.append(xrpl_hash)
+
+    return list(dict.fromkeys(xrpl_hashes))
+
+
+def _match_collateral_reservations(
+    xrpl_txs: dict[str, dict], wait: bool
+) -> dict[str, CollateralReserved]:
+    # NOTE: one block range covers all transactions, so there are two block
+    # searches and one scan instead of one of each per hash, reservations of all
+    # minters are then resolved in one batch and joined with the hashes here
+    mac = c.master_account_controller
+    f = c.flare
+
+    xrpl_times = [ripple_time_to_posix(t["date"]) for t in xrpl_txs.values()]
+    # subst 90 seconds to account for possible network time lag
+    with trace.span("block_search"):
+        from_block = f.find_block_near_timestamp(min(xrpl_times) - 90)
+        to_block = f.find_block_near_timestamp(max(xrpl_times) - 90) + 10 * 60
+
+    accounts = sorted({t["Account"] for t in xrpl_txs.values()})
+    with trace.span("personal_account"):
+        calls = [mac.get_personal_account_call(a) for a in accounts]
+        minters = set(mac.batch_read(calls))
+    watcher = CollateralReservedWatcher(
+        event_index, c.asset_manager, from_block, to_block
+    )
+
+    crts: dict[str, CollateralReserved] = {}
+
+    def match_crts() -> None:
+        with trace.span("log_scan"):
+            reservations = [r for r in watcher.poll() if r.minter in minters]
+        with trace.span("match"):
+            mapped_hashes = mac.get_transaction_ids_for_collateral_reservations(
+                [r.collateral_reservation_id for r in reservations]
+            )
+
+        for r, mapped_hash in zip(reservations, mapped_hashes, strict=True):
+            mapped_hash = mapped_hash.upper()
+            if mapped_hash in xrpl_txs:
+                crts.setdefault(mapped_hash, r)
+
+    match_crts()
+
+    if len(crts) < len(xrpl_txs) and wait:
+        for _ in range(12):
+            time.sleep(5)
+            match_crts()
+
+            if len(crts) == len(xrpl_txs):
+                break
+
+    return crts
+
+
+def bridge_mint_tx_batch(args: BridgeMintTx):
+    assert args.batch is not None
+    x = c.xrpl
+
+    xrpl_hashes = _read_xrpl_hashes(args.batch)
+
+    errors: dict[str, str] = {}
+    xrpl_txs: dict[str, dict] = {}
+    with trace.span("xrpl_get_tx"):
+        responses = x.get_txs(xrpl_hashes)
+
+    for xrpl_hash, response in zip(xrpl_hashes, responses, strict=True):
+        tx_json = response.result.get("tx_json", {})
+        if response.is_successful() and "date" in tx_json:
+            xrpl_txs[xrpl_hash] = tx_json
+        else:
+            errors[xrpl_hash] = response.result.get("error", "transaction not found")
+
+    crts = _match_collateral_reservations(xrpl_txs, args.wait) if xrpl_txs else {}
+
+    matched = [h for h in xrpl_hashes if h in crts]
+    if matched:
+        # payments past the last underlying block would only be rejected by the
+        # ledger, e.g. reservations found by a backfill after an outage
+        validated_ledger = x.get_validated_ledger_sequence()
+        for h in matched:
+            if crts[h].last_underlying_block <= validated_ledger:
+                errors[h] = "payment window expired"
+        matched = [h for h in matched if h not in errors]
+
+    results = {}
+    if matched:
+        payments = [
+            PaymentParams(
+                amount=crts[h].value_uba + crts[h].fee_uba,
+                fee=10,
+                destination=crts[h].payment_address,
+                memos=crts[h].payment_reference.hex(),
+                last_ledger_sequence=crts[h].last_underlying_block,
+            )
+            for h in matched
+        ]
+        with trace.span("submit"):
+            results = dict(zip(matched, x.send_txs(payments), strict=True))
+
+    for h in xrpl_hashes:
+        if h in results:
+            print(
+                json.dumps(
+                    {
+                        "xrpl_hash": h,
+                        "collateral_reservation_id": crts[h].collateral_reservation_id,
+                        **attrs.asdict(results[h]),
+                    }
+                )
+            )
+        else:
+            error = errors.get(h, "could not find matching CollateralReserved event")
+            print(json.dumps({"xrpl_hash": h, "error": error}))
+
+    succeeded = sum(r.result == "tesSUCCESS" for r in results.values())
+    print(
+        f"sent mint transactions: {succeeded}/{len(xrpl_hashes)} succeeded",
+        file=sys.stderr,
+    )
+    if succeeded != len(xrpl_hashes):
+        return 1
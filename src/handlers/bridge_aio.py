@@ -0,0 +1,132 @@
+import asyncio
+import sys
+
+from py_flare_common.smart_accounts.encoder import decoder
+from xrpl.utils import ripple_time_to_posix
+
+from clients.flare.aio import Client as FlareClient
+from clients.flare.asset_manager import CollateralReserved
+from clients.flare.event_index import CollateralReservedWatcher, event_index
+from clients.singleton import clients as c
+from clients.xrpl.aio import Client as XrplClient
+from configuration.trace import trace
+from src.cli.types import BridgeInstruction, BridgeMintTx
+from src.handlers import bridge
+
+
+async def bridge_instruction(args: BridgeInstruction):
+    if args.batch is not None:
+        # submissions are already pipelined, nothing to overlap beyond that
+        return await asyncio.to_thread(bridge.bridge_instruction_batch, args)
+    if args.instruction is None:
+        raise ValueError("instruction or --batch is required")
+
+    mac = c.master_account_controller
+    x = XrplClient.default()
+
+    instruction_cls = decoder.Decoder.with_all_instructions().decode(args.instruction)
+    instruction_cls.decode(args.instruction)
+
+    # both are usually served from the on disk cache, misses are read together
+    fee, wallets = await trace.timed(
+        "fees",
+        asyncio.gather(
+            asyncio.to_thread(mac.get_instruction_fee, instruction_cls.INSTRUCTION_ID),
+            asyncio.to_thread(mac.get_xrpl_provider_wallets),
+        ),
+    )
+
+    tx = await trace.timed(
+        "submit",
+        x.send_tx(
+            amount=fee,
+            fee="10",
+            destination=wallets[0],
+            memos=args.instruction.removeprefix("0x"),
+        ),
+    )
+
+    print(f"sent bridge instruction transaction: {tx.result['hash']}", file=sys.stderr)
+    print(tx.result["hash"])
+
+
+async def bridge_mint_tx(args: BridgeMintTx):
+    if args.batch is not None:
+        # one scan and one batch of lookups for all hashes, run as in the sync path
+        return await asyncio.to_thread(bridge.bridge_mint_tx_batch, args)
+    if args.xrpl_hash is None:
+        raise ValueError("xrpl hash or --batch is required")
+
+    x = XrplClient.default()
+
+    async with FlareClient.default() as f:
+        # contract clients resolve the registry (sync) while the xrpl transaction
+        # is fetched
+        (mac, am), xrpl_response = await asyncio.gather(
+            asyncio.to_thread(lambda: (c.master_account_controller, c.asset_manager)),
+            trace.timed("xrpl_get_tx", x.get_tx(args.xrpl_hash.removeprefix("0x"))),
+        )
+        xrpl_tx = xrpl_response.result
+
+        xrpl_time = ripple_time_to_posix(xrpl_tx["tx_json"]["date"])
+        # subst 90 seconds to account for possible network time lag
+        flare_block, minter = await asyncio.gather(
+            trace.timed("block_search", f.find_block_near_timestamp(xrpl_time - 90)),
+            trace.timed(
+                "personal_account",
+                f.read(mac.get_personal_account_call(xrpl_tx["tx_json"]["Account"])),
+            ),
+        )
+
+        xrpl_hash = args.xrpl_hash.removeprefix("0x").upper()
+        watcher = CollateralReservedWatcher(
+            event_index, am, flare_block, flare_block + 10 * 60, minter=minter
+        )
+
+        async def find_crt() -> CollateralReserved | None:
+            # the index and log scanner are sync, they run off the event loop
+            reservations = await trace.timed(
+                "log_scan", asyncio.to_thread(watcher.poll)
+            )
+            # one batched read, sharing the client's memo of known transaction ids
+            mapped_hashes = await trace.timed(
+                "match",
+                asyncio.to_thread(
+                    mac.get_transaction_ids_for_collateral_reservations,
+                    [_c.collateral_reservation_id for _c in reservations],
+                ),
+            )
+
+            for _c, mapped_hash in zip(reservations, mapped_hashes, strict=True):
+                if mapped_hash.upper() == xrpl_hash:
+                    return _c
+
+            return None
+
+        crt = await find_crt()
+
+        if crt is None and args.wait:
+            for _ in range(12):
+                await asyncio.sleep(5)
+                crt = await find_crt()
+
+                if crt is not None:
+                    break
+
+    if crt is None:
+        print("could not find matching CollateralReserved event", file=sys.stderr)
+        return
+
+    tx = await trace.timed(
+        "submit",
+        x.send_tx(
+            amount=crt.value_uba + crt.fee_uba,
+            fee=10,
+            destination=crt.payment_address,
+            memos=crt.payment_reference.hex(),
+            last_ledger_sequence=crt.last_underlying_block,
+        ),
+    )
+
+    print(f"sent mint tx: {tx.result['hash']}", file=sys.stderr)
+    print(tx.result["hash"])
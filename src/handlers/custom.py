@@ -1,25 +1,78 @@
 import json
+import sys
 
-from web3 import exceptions
-
-from clients import FlareSigningClient
 from clients.singleton import clients as c
-from configuration.settings import settings
-from src.cli.types import CustomRegister
+from configuration.trace import trace
+from src.cli.types import CustomRegister, lines_read_file_or_stdin
+
+
+def _read_custom_instructions(args: CustomRegister) -> list:
+    if args.batch is not None:
+        lines = lines_read_file_or_stdin(args.batch)
+    elif args.custom_instruction is not None:
+        lines = iter([args.custom_instruction])
+    else:
+        raise ValueError("custom instruction or --batch is required")
+
+    data = []
+    for n, line in enumerate(lines, 1):
+        try:
+            data.append(json.loads(line))
+        except ValueError as e:
+            raise ValueError(f"line {n}: {', '.join(map(str, e.args))}") from e
+    return data
 
 
 def custom_register(args: CustomRegister):
     mac = c.master_account_controller
-    f = FlareSigningClient.default_with_pk(settings.flr_private_key)
+    data = _read_custom_instructions(args)
+
+    # hashes are computed locally and checked for existence in one batch, so only
+    # instructions that are not registered yet are sent
+    with trace.span("encode"):
+        encoded = mac.encode_custom_instructions(data)
+    with trace.span("registered_check"):
+        registered = mac.are_custom_instructions_registered(encoded)
+
+    missing = {}
+    for e, r, d in zip(encoded, registered, data, strict=True):
+        if not r:
+            missing.setdefault(e, d)
 
-    data = json.loads(args.custom_instruction)
+    failed = []
+    if missing:
+        # NOTE: memoized gas estimates skip the preflight that would catch a revert
+        # (e.g. a lost race with another registrant), so receipts are checked
+        with trace.span("submit"):
+            f = c.flare_signing
+            results = f.send_transactions(
+                [mac.register_custom_instruction(d) for d in missing.values()],
+                wait=False,
+            )
+            # registrations that were sent are awaited even when a later one failed
+            sent = [r.hash for r in results if r.hash is not None]
+            receipts = dict(zip(sent, f.wait_for_receipts(sent), strict=True))
 
-    encoded = mac.encode_custom_instruction(data)
+        for e, r in zip(missing, results, strict=True):
+            if r.hash is None:
+                failed.append(r)
+                print(
+                    f"registration of {e[2:].hex()} failed: {r.error}", file=sys.stderr
+                )
+            elif receipts[r.hash]["status"] != 1:
+                failed.append(r)
+                print(
+                    f"registration transaction 0x{r.hash.hex()} reverted",
+                    file=sys.stderr,
+                )
 
-    try:
-        tx = mac.register_custom_instruction(data)
-        f.send_transaction(tx)
-    except exceptions.ContractCustomError:
-        pass
+    print(
+        f"registered {len(missing) - len(failed)} custom instructions, "
+        f"{len(set(encoded)) - len(missing)} already registered, {len(failed)} failed",
+        file=sys.stderr,
+    )
+    for e in encoded:
+        print(e[2:].hex())
 
-    print(encoded[2:].hex())
+    if failed:
+        return 1
@@ -1,8 +1,70 @@
-from py_flare_common.smart_accounts.encoder import decoder
+import datetime
+import functools
+import json
+import sys
+from typing import Any
 
-from src.cli.types import DecodeInstruction
+import attrs
+from py_flare_common.smart_accounts.encoder import decoder, exceptions, instructions
 
+from src.cli.types import DecodeInstruction, lines_read_file_or_stdin
 
-def decode_instruction(args: DecodeInstruction):
+
+@functools.cache
+def instruction_table() -> dict[int, type[instructions.InstructionAbc]]:
+    # instruction id (first byte) -> class, built once per process
     d = decoder.Decoder.with_all_instructions()
-    print(d.decode(args.instruction).decode(args.instruction))
+    return {c.INSTRUCTION_ID: c for c in d.all()}
+
+
+def decode(instruction: str) -> instructions.InstructionAbc:
+    try:
+        b = bytes.fromhex(instruction.removeprefix("0x"))
+    except ValueError as e:
+        raise exceptions.DecodeError("invalid hex") from e
+
+    if len(b) != 32:
+        raise exceptions.DecodeError("must be 32 bytes")
+
+    instruction_cls = instruction_table().get(b[0])
+    if instruction_cls is None:
+        raise exceptions.DecodeError("invalid instruction id")
+
+    return instruction_cls.decode(b)
+
+
+def decode_instruction(args: DecodeInstruction):
+    if args.batch is not None:
+        return decode_batch(args)
+    if args.instruction is None:
+        raise ValueError("instruction or --batch is required")
+
+    print(decode(args.instruction))
+
+
+def _serialize(_: Any, __: Any, value: Any) -> Any:
+    # dates (upshift claim) as the yyyymmdd int the encoder takes back
+    if isinstance(value, datetime.date):
+        return instructions.date_to_yyyymmdd(value)
+    return value
+
+
+def decode_batch(args: DecodeInstruction):
+    assert args.batch is not None
+
+    # NOTE: lines are decoded and written one at a time so arbitrarily large inputs
+    # stream through, lines that are not instructions are reported and skipped
+    out = sys.stdout
+    for line in lines_read_file_or_stdin(args.batch):
+        try:
+            decoded = decode(line)
+        except (ValueError, exceptions.DecodeError) as e:
+            row = {"instruction": line, "error": ", ".join(map(str, e.args))}
+        else:
+            row = {
+                "instruction": line,
+                "type": type(decoded).__name__,
+                "fields": attrs.asdict(decoded, value_serializer=_serialize),
+            }
+
+        out.write(json.dumps(row) + "\n")
@@ -1,8 +1,55 @@
-from py_flare_common.smart_accounts.encoder import instructions
+import sys
+from typing import Any
+
+from py_flare_common.smart_accounts.encoder import exceptions, instructions
 
 from configuration.settings import settings
+from src.cli.types import ENCODE_INSTRUCTIONS, EncodeBatch, rows_read_file_or_stdin
 
 
 def encode_omni(args: instructions.InstructionAbc):
     object.__setattr__(args, "wallet_id", settings.chain_config.wallet_id)
     return print(f"0x{args.encode().hex()}")
+
+
+def _encode_row(row: Any, wallet_id: int) -> bytes:
+    if not isinstance(row, dict):
+        raise ValueError("expected an object")
+
+    try:
+        encode_cls = ENCODE_INSTRUCTIONS[row["subcommand"]]
+    except KeyError as e:
+        raise ValueError("unknown or missing subcommand") from e
+
+    try:
+        instruction = encode_cls.from_mapping({**row, "wallet_id": wallet_id})
+        return instruction.encode()  # type: ignore
+    except (ValueError, TypeError, exceptions.EncodeError) as e:
+        raise ValueError(", ".join(map(str, e.args))) from e
+
+
+def _row_error(n: int, e: ValueError) -> int:
+    print(f"error: row {n}: {', '.join(map(str, e.args))}", file=sys.stderr)
+    return 2
+
+
+def encode_batch(args: EncodeBatch):
+    # resolve wallet id once for the whole batch instead of once per instruction
+    wallet_id = args.wallet_id
+    if wallet_id is None:
+        wallet_id = settings.chain_config.wallet_id
+
+    # NOTE: references are streamed as rows are read, a bad row stops the batch
+    # with its row number so the output so far lines up with the input
+    out = sys.stdout
+    n = 0
+    try:
+        for n, row in enumerate(rows_read_file_or_stdin(args.file, args.format), 1):
+            try:
+                encoded = _encode_row(row, wallet_id)
+            except ValueError as e:
+                return _row_error(n, e)
+            out.write(f"0x{encoded.hex()}\n")
+    except ValueError as e:
+        # not json, raised while the row is read so before n is advanced
+        return _row_error(n + 1, e)
@@ -0,0 +1,35 @@
+import sys
+import time
+
+from clients.flare.event_index import event_index
+from clients.flare.master_account_controller import VaultType
+from clients.singleton import clients as c
+from src.cli.types import IndexSync
+
+
+def index_sync(args: IndexSync):
+    mac = c.master_account_controller
+    am = c.asset_manager
+
+    while True:
+        to_block = event_index.sync(
+            am, "CollateralReserved", args.from_block, args.to_block
+        )
+        event_index.sync(mac, "RedeemRequested", args.from_block, to_block)
+
+        for vault in mac.get_vaults().values():
+            if vault.type != VaultType.FIRELIGHT:
+                continue
+            event_index.sync(
+                mac.cached_get_firelight_client(vault),
+                "WithdrawRequest",
+                args.from_block,
+                to_block,
+            )
+
+        print(f"indexed events up to block {to_block}", file=sys.stderr)
+
+        if not args.follow or args.to_block is not None:
+            return
+
+        time.sleep(5)
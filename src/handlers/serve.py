@@ -0,0 +1,268 @@
+import contextlib
+import contextvars
+import functools
+import hmac
+import http.server
+import io
+import json
+import os
+import secrets
+import socketserver
+import sys
+import traceback
+import urllib.parse
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from py_flare_common.smart_accounts.encoder import exceptions
+
+from configuration.settings import settings
+from configuration.trace import trace
+from src import cli
+from src.cli import resolver
+from src.cli.types import Serve
+
+
+class ContextStream:
+    # stands in for sys.stdin/stdout/stderr, a request that set a buffer reads and
+    # writes its own one, everything else the original stream. a context variable
+    # (not thread local) so `asyncio.to_thread` workers of a request still see it
+    def __init__(self, name: str, default: Any) -> None:
+        self._default = default
+        self._stream: contextvars.ContextVar[Any] = contextvars.ContextVar(
+            name, default=None
+        )
+
+    def set(self, stream: Any) -> contextvars.Token:
+        return self._stream.set(stream)
+
+    def reset(self, token: contextvars.Token) -> None:
+        self._stream.reset(token)
+
+    def _current(self) -> Any:
+        return self._stream.get() or self._default
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._current(), name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._current())
+
+
+@contextlib.contextmanager
+def _captured(stdin: str) -> Iterator[tuple[io.StringIO, io.StringIO]]:
+    streams: list[ContextStream] = [sys.stdin, sys.stdout, sys.stderr]  # type: ignore
+    buffers = [io.StringIO(stdin), io.StringIO(), io.StringIO()]
+    tokens = [s.set(b) for s, b in zip(streams, buffers, strict=True)]
+
+    try:
+        yield buffers[1], buffers[2]
+    finally:
+        for s, t in zip(streams, tokens, strict=True):
+            s.reset(t)
+
+
+@functools.cache
+def _routes() -> dict[str, resolver.ResolverFn]:
+    return {route: r for route, r in resolver.routes() if route != "serve"}
+
+
+@functools.cache
+def _parser():
+    return cli.get_parser()
+
+
+def execute(
+    route: str, args: list[str], stdin: str, use_async: bool
+) -> tuple[int, dict[str, Any]]:
+    # runs one command the way the cli would, with its own stdin and output
+    r = _routes()[route]
+
+    with _captured(stdin) as (out, err):
+        try:
+            namespace = _parser().parse_args([*route.split("/"), *args])
+            namespace.use_async = use_async
+            if getattr(namespace, "follow", False):
+                # would hold the request (and its thread) forever
+                raise ValueError("--follow is not supported by serve")
+            exit_code = resolver.run(r, namespace) or 0
+            status = 200
+        except SystemExit as e:
+            # argparse usage errors (and --help)
+            exit_code = e.code if isinstance(e.code, int) else 2
+            status = 200 if exit_code == 0 else 400
+        except (ValueError, exceptions.DecodeError) as e:
+            print(f"error: {', '.join(map(str, e.args))}", file=sys.stderr)
+            exit_code, status = 2, 400
+        except Exception:
+            traceback.print_exc()
+            exit_code, status = 1, 500
+
+    return status, {
+        "exit_code": exit_code,
+        "stdout": out.getvalue(),
+        "stderr": err.getvalue(),
+    }
+
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    # GET / lists the commands, GET /metrics exports `trace` as openmetrics and
+    # POST /<command>[/<subcommand>] runs one with {"args": [...], "stdin": "..."}
+    # and answers with its exit code and output
+    def __init__(
+        self,
+        *args: Any,
+        use_async: bool,
+        token: str | None,
+        hosts: set[str],
+        **kwargs: Any,
+    ) -> None:
+        self.use_async = use_async
+        # NOTE: commands sign and send with the configured keys, over tcp every
+        # request needs the bearer token and a local Host (no dns rebinding),
+        # unix sockets are guarded by their file permissions instead
+        self.token = token
+        self.hosts = hosts
+        super().__init__(*args, **kwargs)
+
+    def _rejected(self) -> bool:
+        if self.token is None:
+            return False
+
+        host = urllib.parse.urlsplit(f"//{self.headers.get('Host', '')}").hostname
+        if host not in self.hosts:
+            self._respond(403, {"error": "host not allowed"})
+            return True
+
+        authorization = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(
+            authorization.encode(), f"Bearer {self.token}".encode()
+        ):
+            self._respond(401, {"error": "missing or invalid bearer token"})
+            return True
+
+        return False
+
+    def _respond(self, status: int, body: dict[str, Any]) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # unix socket clients have no address, which the default format expects
+        print(format % args, file=sys.__stderr__)
+
+    def do_GET(self) -> None:
+        if self._rejected():
+            return
+
+        if self.path.strip("/") == "metrics":
+            data = trace.openmetrics().encode()
+            self.send_response(200)
+            self.send_header(
+                "Content-Type",
+                "application/openmetrics-text; version=1.0.0; charset=utf-8",
+            )
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        if self.path.strip("/") != "":
+            return self._respond(404, {"error": f"unknown path {self.path}"})
+        self._respond(200, {"commands": list(_routes())})
+
+    def do_POST(self) -> None:
+        if self._rejected():
+            return
+
+        # a browser can not send this cross site without a cors preflight
+        if self.headers.get_content_type() != "application/json":
+            return self._respond(
+                415, {"error": "content type must be application/json"}
+            )
+
+        route = self.path.strip("/")
+        if route not in _routes():
+            return self._respond(404, {"error": f"unknown command {route}"})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            args = [str(a) for a in body.get("args", [])]
+            stdin = str(body.get("stdin", ""))
+        except (ValueError, AttributeError, TypeError) as e:
+            return self._respond(400, {"error": f"invalid request: {e}"})
+
+        self._respond(*execute(route, args, stdin, self.use_async))
+
+
+class HTTPServer(http.server.ThreadingHTTPServer):
+    # bursts of concurrent clients queue instead of being reset
+    request_queue_size = 128
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+@contextlib.contextmanager
+def _umask(mask: int) -> Iterator[None]:
+    previous = os.umask(mask)
+    try:
+        yield
+    finally:
+        os.umask(previous)
+
+
+def serve(args: Serve):
+    # NOTE: one process keeps the settings, registry, clients and their caches
+    # warm between requests, which are handled in a thread each
+    sys.stdin = ContextStream("stdin", sys.stdin)  # type: ignore
+    sys.stdout = ContextStream("stdout", sys.stdout)  # type: ignore
+    sys.stderr = ContextStream("stderr", sys.stderr)  # type: ignore
+    # always measured, so /metrics has something to export
+    trace.enable()
+
+    # handler modules are imported upfront instead of by the first requests
+    for _, (_, handler_path) in _routes().items():
+        resolver.load_handler(handler_path)
+    _parser()
+
+    server: socketserver.BaseServer
+    if args.unix_socket is not None:
+        handler = functools.partial(
+            RequestHandler, use_async=args.use_async, token=None, hosts=set()
+        )
+        path = Path(args.unix_socket)
+        if path.is_socket():
+            path.unlink()
+        # only the owner can connect
+        with _umask(0o177):
+            server = UnixHTTPServer(str(path), handler)
+        print(f"listening on {path}", file=sys.stderr)
+    else:
+        token = settings.serve_token
+        if token is None:
+            token = secrets.token_urlsafe(32)
+            print(f"bearer token: {token}", file=sys.stderr)
+        hosts = LOCAL_HOSTS | {args.host} - {"0.0.0.0", "::", ""}
+        handler = functools.partial(
+            RequestHandler, use_async=args.use_async, token=token, hosts=hosts
+        )
+        server = HTTPServer((args.host, args.port), handler)
+        print(f"listening on http://{args.host}:{args.port}", file=sys.stderr)
+
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from clients.flare.master_account_controller import Client
+from configuration.custom_instruction import encode_custom_instructions
+
+# instructions and their expected hashes, "source" tells where a hash comes from:
+# "contract" for `encodeCustomInstruction` outputs recorded against a node with
+# `./scripts/verify_custom_instruction_encoder.py -r FILE`, "reference" for ones
+# computed with eth_abi.encode + keccak, which only guard against regressions of
+# the local encoder and not against a change of the contract's hashing
+# NOTE: the committed cases are all "reference" until recorded against coston2
+FIXTURE = Path(__file__).parent / "fixtures" / "encode_custom_instruction.jsonl"
+CASES = [json.loads(line) for line in FIXTURE.read_text().splitlines()]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_local_encoder_matches_fixture(case):
+    (encoded,) = encode_custom_instructions([case["instruction"]])
+    assert encoded.hex() == case["hash"]
+
+
+def test_encoder_batch_matches_single():
+    encoded = encode_custom_instructions([c["instruction"] for c in CASES])
+    assert [e.hex() for e in encoded] == [c["hash"] for c in CASES]
+
+
+class ContractCall:
+    def __init__(self, result: bytes) -> None:
+        self.result = result
+
+    def call(self) -> bytes:
+        return self.result
+
+
+def test_contract_fallback_on_mismatch(capsys):
+    # a contract hashing differently is used for every instruction, with a warning
+    instructions = [c["instruction"] for c in CASES]
+    mac = object.__new__(Client)
+    mac.encode_custom_instruction_call = lambda i: ContractCall(b"\1" * 32)
+    mac.batch_read = lambda calls: [c.result for c in calls]
+
+    assert mac.encode_custom_instructions(instructions) == [b"\1" * 32] * len(CASES)
+    assert "warning" in capsys.readouterr().err
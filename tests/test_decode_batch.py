@@ -0,0 +1,54 @@
+import json
+
+import attrs
+
+from src.cli.types import DecodeInstruction
+from src.handlers.decode import decode_batch, instruction_table
+
+# one valid value per field name used by the instructions
+FIELDS = {
+    "wallet_id": 136,
+    "value": 1,
+    "agent_vault_id": 2,
+    "vault_id": 3,
+    "recipient_address": "0x0101010101010101010101010101010101010101",
+    "call_hash": "0x" + "ab" * 30,
+}
+# fields of one instruction that need a different value
+OVERRIDES = {"UpshiftClaim": {"value": 20250101}}
+
+
+def memo(instruction_cls) -> str:
+    values = {**FIELDS, **OVERRIDES.get(instruction_cls.__name__, {})}
+    fields = {a.name: values[a.name] for a in attrs.fields(instruction_cls)}
+    return "0x" + instruction_cls(**fields).encode().hex()
+
+
+def test_every_instruction_type_is_decoded(tmp_path, capsys):
+    table = instruction_table()
+    memos = [memo(c) for c in table.values()]
+
+    batch = tmp_path / "memos.txt"
+    batch.write_text("\n".join([*memos, "0xnot-hex"]) + "\n")
+    decode_batch(DecodeInstruction(batch=str(batch), instruction=None))
+
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(rows) == len(memos) + 1
+    assert "error" in rows[-1]
+
+    for m, row, instruction_cls in zip(memos, rows[:-1], table.values(), strict=True):
+        assert row["instruction"] == m
+        assert row["type"] == instruction_cls.__name__
+        # the fields are json the encoder takes back
+        assert "0x" + instruction_cls(**row["fields"]).encode().hex() == m
+
+
+def test_dates_are_yyyymmdd(tmp_path, capsys):
+    (instruction_cls,) = [
+        c for c in instruction_table().values() if c.__name__ == "UpshiftClaim"
+    ]
+    batch = tmp_path / "memos.txt"
+    batch.write_text(memo(instruction_cls) + "\n")
+    decode_batch(DecodeInstruction(batch=str(batch), instruction=None))
+
+    assert json.loads(capsys.readouterr().out)["fields"]["value"] == 20250101
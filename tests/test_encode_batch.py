@@ -0,0 +1,30 @@
+import pytest
+
+from src.cli.types import EncodeBatch
+from src.handlers.encode import encode_batch
+
+ROW = '{"subcommand": "fxrp-cr", "value": 1, "agent_vault_id": 2}'
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        "[1]",
+        '{"subcommand": "unknown"}',
+        '{"subcommand": "fxrp-cr", "value": 1}',
+        '{"subcommand": "fxrp-cr", "value": "x", "agent_vault_id": 2}',
+        "{not json",
+    ],
+)
+def test_bad_row_is_reported_with_its_number(tmp_path, capsys, bad):
+    batch = tmp_path / "rows.jsonl"
+    batch.write_text("\n".join([ROW, ROW, bad, ROW]) + "\n")
+
+    exit_code = encode_batch(EncodeBatch(file=str(batch), format="json", wallet_id=1))
+
+    out, err = capsys.readouterr()
+    assert exit_code == 2
+    # rows before the bad one were already written
+    assert len(out.splitlines()) == 2
+    assert err.startswith("error: row 3: ")
+    assert "Traceback" not in err